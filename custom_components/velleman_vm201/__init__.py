@@ -7,17 +7,22 @@ from dataclasses import dataclass
 import logging
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_HOST, Platform
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import device_registry as dr, entity_registry as er
 from homeassistant.helpers.device_registry import DeviceEntry
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
+from .cache import TopologyCache
+from .config_flow import controller_name
+from .const import CONF_CONTROLLER_NAME, DEFAULT_CONTROLLER_NAME, DOMAIN
 from .coordinator import VellemanCoordinator
+from .runtime import RelayRuntimeTracker
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.SENSOR]
+PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.SENSOR, Platform.SWITCH]
 
 type MyConfigEntry = ConfigEntry[RuntimeData]
 
@@ -35,15 +40,20 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: MyConfigEntry) ->
     # Initialise the coordinator that manages data updates from your api.
     # This is defined in coordinator.py
     coordinator = VellemanCoordinator(hass, config_entry)
+    await coordinator.relay_runtime.async_load()
 
-    # Perform an initial data load from api.
-    # async_config_entry_first_refresh() is special in that it does not log errors if it fails
-    await coordinator.async_config_entry_first_refresh()
+    # When the topology was cached at the last start, the entities are created
+    # from it and the first live refresh runs in the background once they exist.
+    from_cache = await coordinator.async_load_cached_topology()
+    if not from_cache:
+        # Perform an initial data load from api.
+        # async_config_entry_first_refresh() is special in that it does not log errors if it fails
+        await coordinator.async_config_entry_first_refresh()
 
-    # Test to see if api initialised correctly, else raise ConfigNotReady to make HA retry setup
-    # TODO: Change this to match how your api will know if connected or successful update
-    if not coordinator.api.connected:
-        raise ConfigEntryNotReady
+        # Test to see if api initialised correctly, else raise ConfigNotReady to make HA retry setup
+        # TODO: Change this to match how your api will know if connected or successful update
+        if not coordinator.api.connected:
+            raise ConfigEntryNotReady
 
     # Initialise a listener for config flow options changes.
     # This will be removed automatically if the integraiton is unloaded.
@@ -62,10 +72,115 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: MyConfigEntry) ->
     # This calls the async_setup method in each of your entity type files.
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
 
+    if from_cache:
+        config_entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} first refresh {config_entry.title}"
+        )
+    if coordinator.push is not None:
+        config_entry.async_create_background_task(
+            hass, coordinator.push.run(), f"{DOMAIN} push updates {config_entry.title}"
+        )
+    if coordinator.input_sample_interval:
+        config_entry.async_create_background_task(
+            hass, coordinator.async_sample_inputs(), f"{DOMAIN} input sampling {config_entry.title}"
+        )
+
     # Return true to denote a successful setup.
     return True
 
 
+async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
+    """Migrate an old config entry."""
+    if config_entry.version > 2:
+        # Created by a newer version of the integration
+        return False
+    if config_entry.version == 1:
+        await _async_migrate_controller_name(hass, config_entry)
+    return True
+
+
+async def _async_migrate_controller_name(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Give a version 1 entry unique ids of its own.
+
+    Version 1 entries used the title as unique id and, unless created by
+    the latest version 1 flow, the shared controller name "VM201" as
+    prefix of their channel ids, so all boards shared one device. The
+    entities, device, cached topology and relay counters of the entry are
+    moved to the controller name made from its host.
+    """
+    old_name = config_entry.data.get(CONF_CONTROLLER_NAME, DEFAULT_CONTROLLER_NAME)
+    new_name = config_entry.data.get(CONF_CONTROLLER_NAME) or controller_name(
+        config_entry.data[CONF_HOST]
+    )
+
+    def rename(unique_id: str) -> str:
+        if unique_id.startswith(f"{old_name}_"):
+            return new_name + unique_id.removeprefix(old_name)
+        return unique_id
+
+    if new_name != old_name:
+
+        @callback
+        def migrate_entity(entity: er.RegistryEntry) -> dict[str, str] | None:
+            prefix = f"{DOMAIN}-"
+            if not entity.unique_id.startswith(prefix):
+                return None
+            unique_id = prefix + rename(entity.unique_id.removeprefix(prefix))
+            return {"new_unique_id": unique_id} if unique_id != entity.unique_id else None
+
+        await er.async_migrate_entries(hass, config_entry.entry_id, migrate_entity)
+
+        cache = TopologyCache(hass, config_entry.entry_id)
+        if (cached := await cache.async_load()) is not None:
+            devices, deviceInfo = cached
+            for device in devices:
+                device.device_unique_id = rename(device.device_unique_id)
+            await cache.async_save(devices, deviceInfo)
+
+        runtime = RelayRuntimeTracker(hass, config_entry.entry_id)
+        await runtime.async_load()
+        if runtime.relays:
+            runtime.relays = {rename(unique_id): relay for unique_id, relay in runtime.relays.items()}
+            await runtime.async_save()
+
+    # Version 1 device identifiers had a "-1" suffix
+    device_registry = dr.async_get(hass)
+    if (
+        device := device_registry.async_get_device(identifiers={(DOMAIN, f"{old_name}-1")})
+    ) is not None and config_entry.entry_id in device.config_entries:
+        if device.config_entries == {config_entry.entry_id}:
+            device_registry.async_update_device(device.id, new_identifiers={(DOMAIN, new_name)})
+        else:
+            # Shared by several boards: move the entities of this one to a
+            # device of its own before leaving the shared one, which would
+            # otherwise remove them.
+            board = device_registry.async_get_or_create(
+                config_entry_id=config_entry.entry_id,
+                identifiers={(DOMAIN, new_name)},
+                name=device.name,
+                manufacturer=device.manufacturer,
+                model=device.model,
+                sw_version=device.sw_version,
+            )
+            entity_registry = er.async_get(hass)
+            for entity in er.async_entries_for_device(
+                entity_registry, device.id, include_disabled_entities=True
+            ):
+                if entity.config_entry_id == config_entry.entry_id:
+                    entity_registry.async_update_entity(entity.entity_id, device_id=board.id)
+            device_registry.async_update_device(
+                device.id, remove_config_entry_id=config_entry.entry_id
+            )
+
+    hass.config_entries.async_update_entry(
+        config_entry,
+        data={**config_entry.data, CONF_CONTROLLER_NAME: new_name},
+        unique_id=new_name,
+        version=2,
+    )
+    _LOGGER.debug("Migrated %s to controller name %s", config_entry.title, new_name)
+
+
 async def _async_update_listener(hass: HomeAssistant, config_entry):
     """Handle config options update."""
     # Reload the integration when the options change.
@@ -82,10 +197,18 @@ async def async_remove_config_entry_device(
     return True
 
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Remove the cached topology and relay counters when the config entry is deleted."""
+    await TopologyCache(hass, config_entry.entry_id).async_remove()
+    await RelayRuntimeTracker(hass, config_entry.entry_id).async_remove()
+
+
 async def async_unload_entry(hass: HomeAssistant, config_entry: MyConfigEntry) -> bool:
     """Unload a config entry."""
     # This is called when you remove your integration or shutdown HA.
     # If you have created any custom services, they need to be removed here too.
 
     # Unload platforms and return result
-    return await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
+    if unload_ok := await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS):
+        await config_entry.runtime_data.coordinator.async_shutdown()
+    return unload_ok
@@ -0,0 +1,234 @@
+"""Poll VM201 boards from the command line and profile their responses.
+
+Uses the API and page parsers of the integration without Home
+Assistant. Every round requests the selected pages of each board one after
+the other, with all boards polled concurrently. Per board and page it
+reports the request latency percentiles, payload sizes and parse times:
+
+    python -m custom_components.velleman_vm201 192.168.1.20 192.168.1.21 -n 100
+    python custom_components/velleman_vm201 192.168.1.20 -u admin -p secret --dump dumps/
+
+The second form also works without Home Assistant installed. Responses
+saved with --dump can be parsed again offline with --replay.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable
+import json
+from pathlib import Path
+import statistics
+import sys
+from time import perf_counter
+import types
+
+if not __package__:
+    # Run as a directory: register the package without its __init__, which
+    # imports Home Assistant, so the relative imports below resolve.
+    _package = types.ModuleType("velleman_vm201")
+    _package.__path__ = [str(Path(__file__).resolve().parent)]
+    sys.modules["velleman_vm201"] = _package
+    __package__ = "velleman_vm201"  # noqa: A001
+    # The spec still describes a top level script, imports go by __package__
+    __spec__ = None  # noqa: A001
+
+from .api import (  # noqa: E402
+    ABOUT_PAGE,
+    NAMES_PAGE,
+    STATUS_CGI,
+    APIAuthError,
+    APIConnectionError,
+    AsyncAPI,
+)
+from .const import DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_CONNECTIONS, DEFAULT_TIMEOUT  # noqa: E402
+from .parser import parse_about, parse_names, parse_status  # noqa: E402
+
+# Page name -> URL and parser
+PAGES: dict[str, tuple[str, Callable[[bytes], object]]] = {
+    "status": (STATUS_CGI, parse_status),
+    "names": (NAMES_PAGE, parse_names),
+    "about": (ABOUT_PAGE, parse_about),
+}
+
+
+class PageProfile:
+    """Latencies, sizes and parse times of one page of one board."""
+
+    def __init__(self) -> None:
+        """Initialise."""
+        self.latencies: list[float] = []
+        self.parse_times: list[float] = []
+        self.sizes: list[int] = []
+        self.errors: dict[str, int] = {}
+
+    def add_error(self, err: Exception) -> None:
+        """Count a failed request by error type."""
+        name = type(err).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def as_dict(self) -> dict:
+        """Return the summary of the page."""
+        return {
+            "requests": len(self.sizes) + sum(self.errors.values()),
+            "errors": self.errors,
+            "latency_ms": _percentiles(self.latencies),
+            "parse_ms": _percentiles(self.parse_times),
+            "bytes": {
+                "min": min(self.sizes, default=0),
+                "max": max(self.sizes, default=0),
+                "mean": statistics.fmean(self.sizes) if self.sizes else 0,
+            },
+        }
+
+
+def _percentiles(timings: list[float]) -> dict[str, float]:
+    """Return the percentiles (ms) of the timings (s)."""
+    if not timings:
+        return {}
+    timings = sorted(timing * 1000 for timing in timings)
+
+    def pct(q: float) -> float:
+        return timings[min(len(timings) - 1, int(len(timings) * q))]
+
+    return {"p50": pct(0.50), "p90": pct(0.90), "p99": pct(0.99), "max": timings[-1]}
+
+
+def _dump_name(host: str) -> str:
+    """Return a directory name for a host."""
+    return host.replace(":", "_")
+
+
+async def poll_board(
+    host: str, args: argparse.Namespace, profiles: dict[str, PageProfile]
+) -> None:
+    """Poll one board for all rounds."""
+    api = AsyncAPI(
+        host,
+        args.username,
+        args.password,
+        timeout=args.timeout,
+        connect_timeout=args.connect_timeout,
+        max_connections=args.max_connections,
+    )
+    dump = args.dump / _dump_name(host) if args.dump else None
+    if dump:
+        dump.mkdir(parents=True, exist_ok=True)
+    try:
+        for round_ in range(args.count):
+            if round_:
+                await asyncio.sleep(args.interval)
+            for page in args.pages:
+                url, parse = PAGES[page]
+                profile = profiles[page]
+                start = perf_counter()
+                try:
+                    content = api.check_response(await api.get_request("GET", url))
+                except (APIAuthError, APIConnectionError) as err:
+                    profile.add_error(err)
+                    if isinstance(err, APIAuthError):
+                        print(f"{host}: {err}", file=sys.stderr)
+                        return
+                    continue
+                profile.latencies.append(perf_counter() - start)
+                profile.sizes.append(len(content))
+                start = perf_counter()
+                parse(content)
+                profile.parse_times.append(perf_counter() - start)
+                if dump:
+                    (dump / f"{round_:05d}-{page}.html").write_bytes(content)
+    finally:
+        await api.disconnect()
+
+
+def replay(directory: Path, rounds: int) -> dict[str, dict[str, dict]]:
+    """Parse dumped responses again, rounds times each, and profile the parsers."""
+    results: dict[str, dict[str, dict]] = {}
+    for board in sorted(path for path in directory.iterdir() if path.is_dir()):
+        profiles = {page: PageProfile() for page in PAGES}
+        for dumped in sorted(board.glob("*.html")):
+            page = dumped.stem.partition("-")[2]
+            if page not in PAGES:
+                continue
+            content = dumped.read_bytes()
+            profiles[page].sizes.append(len(content))
+            for _ in range(rounds):
+                start = perf_counter()
+                PAGES[page][1](content)
+                profiles[page].parse_times.append(perf_counter() - start)
+        results[board.name] = {
+            page: profile.as_dict() for page, profile in profiles.items() if profile.sizes
+        }
+    return results
+
+
+def _print(results: dict[str, dict[str, dict]]) -> None:
+    print(
+        f"{'board':22} {'page':7} {'ok':>5} {'err':>4} {'p50 ms':>8} {'p90 ms':>8} "
+        f"{'p99 ms':>8} {'max ms':>8} {'bytes':>7} {'parse ms':>9}"
+    )
+    for host, pages in results.items():
+        for page, result in pages.items():
+            latency = result["latency_ms"]
+            errors = sum(result["errors"].values())
+            print(
+                f"{host:22} {page:7} {result['requests'] - errors:5} {errors:4} "
+                + " ".join(f"{latency.get(key, 0):8.2f}" for key in ("p50", "p90", "p99", "max"))
+                + f" {result['bytes']['mean']:7.0f} {result['parse_ms'].get('p50', 0):9.3f}"
+            )
+            for error, count in result["errors"].items():
+                print(f"{'':22} {'':7} {count:5}x {error}")
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m custom_components.velleman_vm201",
+        description=__doc__.splitlines()[0],
+    )
+    parser.add_argument("hosts", nargs="*", help="board addresses, host or host:port")
+    parser.add_argument("-u", "--username")
+    parser.add_argument("-p", "--password")
+    parser.add_argument("-n", "--count", type=int, default=10, help="rounds to poll")
+    parser.add_argument("-i", "--interval", type=float, default=1.0, help="seconds between rounds")
+    parser.add_argument(
+        "--pages",
+        type=lambda value: value.split(","),
+        default=["status", "names", "about"],
+        help="comma separated pages: status, names, about",
+    )
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--connect-timeout", type=float, default=DEFAULT_CONNECT_TIMEOUT)
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS)
+    parser.add_argument("--dump", type=Path, help="save the responses to this directory")
+    parser.add_argument("--replay", type=Path, help="parse responses saved with --dump")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    if unknown := set(args.pages) - set(PAGES):
+        parser.error(f"unknown pages: {', '.join(sorted(unknown))}")
+    if args.replay and not args.replay.is_dir():
+        parser.error(f"{args.replay} is not a directory")
+    if args.replay:
+        results = replay(args.replay, args.count)
+    elif args.hosts:
+        profiles = {host: {page: PageProfile() for page in args.pages} for host in args.hosts}
+        await asyncio.gather(*(poll_board(host, args, profiles[host]) for host in args.hosts))
+        results = {
+            host: {page: profile.as_dict() for page, profile in pages.items()}
+            for host, pages in profiles.items()
+        }
+    else:
+        parser.error("give one or more hosts, or --replay")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print(results)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -1,17 +1,35 @@
-"""API Placeholder."""
+"""Client for the web pages of a VM201 board.
 
+AsyncAPI reads the names, status and about pages over keep-alive HTTP
+connections made with asyncio streams, and turns them into devices, channel
+states and board info. Responses that did not change since the last request
+are not parsed again.
+"""
+
+import asyncio
 from dataclasses import dataclass
 from enum import StrEnum
 import logging
-from random import choice, randrange
 from typing import Optional
 
-from http.client import (HTTPConnection, HTTPResponse)
 from base64 import b64encode
-from bs4 import BeautifulSoup
+from time import perf_counter
+
+from .const import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_CONTROLLER_NAME,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_TIMEOUT,
+)
+from .parser import StatusInfo, parse_about, parse_names, parse_status
+from .stats import PollStats
 
 _LOGGER = logging.getLogger(__name__)
 
+NAMES_PAGE = "/names.html"
+STATUS_CGI = "/cgi/status.cgi"
+ABOUT_PAGE = "/about.html"
+
 
 class DeviceType(StrEnum):
     """Device types."""
@@ -23,12 +41,6 @@ class DeviceType(StrEnum):
     OTHER = "other"
 
 
-DEVICES = [
-    {"id": 99, "type": DeviceType.TEMP_SENSOR},
-    {"id": 99, "type": DeviceType.DOOR_SENSOR},
-]
-
-
 @dataclass
 class Device:
     """API device."""
@@ -47,105 +59,284 @@ class VMDeviceInfo:
     model: str
     version: str
 
-class API:
-    """Class for example API."""
+_StreamPair = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+@dataclass
+class APIResponse:
+    """A fully read response from the board."""
+
+    status: int
+    body: bytes
+
+
+class AsyncConnectionManager:
+    """Keep-alive HTTP connections to a single VM201 board, using asyncio streams.
 
-    def __init__(self, host: str, user: Optional[str] = None, pwd: Optional[str] = None) -> None:
+    Up to max_connections requests run at the same time, each on a connection
+    of its own; idle connections are kept open for the next requests.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        headers: dict[str, str],
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        stats: PollStats | None = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ) -> None:
         """Initialise."""
         self.host = host
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.stats = stats or PollStats()
+        self.max_connections = max_connections
+        self.connects: int = 0
+        self.reuses: int = 0
+        self._hostname, _, port = host.partition(":")
+        self._port = int(port) if port else 80
+        self._head = "".join(f"{key}: {value}\r\n" for key, value in headers.items())
+        self._idle: list[_StreamPair] = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def request(self, method: str, url: str) -> APIResponse:
+        """Send a request over an idle connection, reconnecting if the board closed it."""
+        async with self._slots:
+            # A reused socket may have been closed by the board in the meantime;
+            # in that case retry on a fresh connection.
+            while True:
+                conn = self._idle.pop() if self._idle else None
+                reused = conn is not None
+                try:
+                    if conn is None:
+                        conn = await self._connect()
+                    start = perf_counter()
+                    async with asyncio.timeout(self.timeout):
+                        status, body, will_close = await self._exchange(conn, method, url)
+                except asyncio.CancelledError:
+                    # The response may be half read, the stream cannot be reused
+                    self._close(conn)
+                    raise
+                except (asyncio.IncompleteReadError, ConnectionError) as err:
+                    self._close(conn)
+                    if reused:
+                        _LOGGER.debug("Connection to %s dropped, reconnecting: %s", self.host, err)
+                        continue
+                    self.stats.add_error()
+                    raise APIConnectionError(f"Error communicating with {self.host}: {err}") from err
+                except (OSError, TimeoutError, ValueError) as err:
+                    self._close(conn)
+                    self.stats.add_error(timeout=isinstance(err, TimeoutError))
+                    raise APIConnectionError(f"Error communicating with {self.host}: {err}") from err
+
+                self.stats.add(f"request {url.partition('?')[0]}", perf_counter() - start)
+                self.stats.add_response(len(body))
+                if reused:
+                    self.reuses += 1
+                if will_close:
+                    self._close(conn)
+                else:
+                    self._idle.append(conn)
+                return APIResponse(status, body)
+
+    async def _exchange(self, conn: _StreamPair, method: str, url: str) -> tuple[int, bytes, bool]:
+        """Write one request and read back the complete response."""
+        reader, writer = conn
+        writer.write(
+            f"{method} {url} HTTP/1.1\r\nHost: {self.host}\r\n{self._head}\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by board")
+        version, status, _ = status_line.decode("latin-1").split(" ", 2)
+
+        headers: dict[str, str] = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        will_close = connection == "close" or (version == "HTTP/1.0" and connection != "keep-alive")
+
+        if "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while size := int((await reader.readline()).split(b";")[0], 16):
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            await reader.readline()
+            body = b"".join(chunks)
+        else:
+            # No framing information, the board signals the end by closing the socket.
+            body = await reader.read()
+            will_close = True
+
+        return int(status), body, will_close
+
+    async def probe(self) -> None:
+        """Make sure a connection to the board can be opened, without a request."""
+        async with self._slots:
+            if self._idle:
+                return
+            try:
+                self._idle.append(await self._connect())
+            except (OSError, TimeoutError) as err:
+                self.stats.add_error(timeout=isinstance(err, TimeoutError))
+                raise APIConnectionError(f"Error connecting to {self.host}: {err}") from err
+
+    async def _connect(self) -> _StreamPair:
+        with self.stats.time("connect"):
+            async with asyncio.timeout(self.connect_timeout):
+                conn = await asyncio.open_connection(self._hostname, self._port)
+        self.connects += 1
+        return conn
+
+    async def close(self) -> None:
+        """Close the connections, once the running requests are done."""
+        for _ in range(self.max_connections):
+            await self._slots.acquire()
+        try:
+            while self._idle:
+                self._close(self._idle.pop())
+        finally:
+            for _ in range(self.max_connections):
+                self._slots.release()
+
+    @staticmethod
+    def _close(conn: _StreamPair | None) -> None:
+        if conn is not None:
+            conn[1].close()
+
+
+class AsyncAPI:
+    """API of a VM201 board, runs directly in the event loop."""
+
+    def __init__(
+        self,
+        host: str,
+        user: Optional[str] = None,
+        pwd: Optional[str] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        controller_name: str = DEFAULT_CONTROLLER_NAME,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ) -> None:
+        """Initialise, allowing up to max_connections requests at the same time."""
+        self.host = host
         self.user = user
         self.pwd = pwd
         self.connected: bool = False
-
-    def get_request(self, method, url) -> HTTPResponse:
-        """Get a request object"""
-        req = HTTPConnection(self.host)
+        self._controller_name = controller_name
 
         # Check if there is a username / password - skip baseAuth
+        headers = {}
         if (self.user is not None) and (self.pwd is not None):
             token = b64encode(f"{self.user}:{self.pwd}".encode('utf-8')).decode("ascii")
-            baseAuthToken = f'Basic {token}'
-            baseHeaders = { 'Authorization' : baseAuthToken }
-            req.request(method, url, headers=baseHeaders)
-        else:
-            req.request(method, url)
-        
-        return req.getresponse()
+            headers["Authorization"] = f"Basic {token}"
+        self.stats = PollStats()
+        self.max_connections = max_connections
+        self.connection = AsyncConnectionManager(
+            host,
+            headers,
+            timeout=timeout,
+            connect_timeout=connect_timeout,
+            stats=self.stats,
+            max_connections=max_connections,
+        )
+        # Last response body and parse result per page, to skip parsing repeated responses
+        self._responses: dict[str, tuple[bytes, object]] = {}
+
+    @property
+    def connection_stats(self) -> dict[str, int]:
+        """Return the number of new and reused connections."""
+        return {"connects": self.connection.connects, "reuses": self.connection.reuses}
 
     @property
     def controller_name(self) -> str:
         """Return the name of the controller."""
-        return "VM201" # self.host.replace(".", "_")
+        return self._controller_name
 
-    def connect(self) -> bool:
-        """Connect to api."""
-        # Connect to the VM201 board
-        res = self.get_request("GET", "/")
-        
-        if res.code == 200:
+    def check_connect(self, res: APIResponse) -> bool:
+        """Check the response of the connectivity request."""
+        if res.status == 200:
             self.connected = True
             return True
         raise APIAuthError("Error connecting to api. Invalid username or password.")
 
-    def disconnect(self) -> bool:
-        """Disconnect from api."""
-        self.connected = False
-        return True
-
-    def get_devices(self) -> list[Device]:
-        """Get devices on api."""
-        # Do an API call te retrieve all the devices
+    def check_response(self, res: APIResponse) -> bytes:
+        """Return the body of a page, which also proves the board is reachable."""
+        if res.status == 401:
+            raise APIAuthError("Error reading from api. Invalid username or password.")
+        if res.status != 200:
+            raise APIConnectionError(f"Error reading from {self.host}: HTTP {res.status}")
+        self.connected = True
+        return res.body
+
+    def _cached(self, url: str, content: bytes) -> object | None:
+        """Return the previous parse result if the page is byte-identical."""
+        if (cached := self._responses.get(url)) is not None and cached[0] == content:
+            self.stats.unchanged += 1
+            return cached[1]
+        return None
+
+    def load_devices(self, content: bytes) -> list[Device]:
+        """Return the devices of the names page, reusing them if the page did not change."""
+        if (devices := self._cached(NAMES_PAGE, content)) is None:
+            devices = self.parse_devices(content)
+            self._responses[NAMES_PAGE] = (content, devices)
+        return devices
+
+    def load_status(self, content: bytes) -> StatusInfo:
+        """Return the channel states, reusing them if the page did not change."""
+        if (status := self._cached(STATUS_CGI, content)) is None:
+            with self.stats.time("parse status"):
+                status = parse_status(content)
+            self._responses[STATUS_CGI] = (content, status)
+        return status
+
+    def load_device_info(self, content: bytes) -> VMDeviceInfo:
+        """Return the board info of the about page, reusing it if the page did not change."""
+        if (info := self._cached(ABOUT_PAGE, content)) is None:
+            info = self.parse_device_info(content)
+            self._responses[ABOUT_PAGE] = (content, info)
+        return info
+
+    def parse_devices(self, content: bytes) -> list[Device]:
+        """Parse the devices from the names page."""
         # 8 Output switches (type should be configurable?)
         #    As there are on_off switches
         #    As there are toggle switches
         # 8 Output sensors (state of switch)
         # 1 Input sensor
 
-        htmlContent = BeautifulSoup(self.get_request("GET", "/names.html").read(), 'html.parser')
         _LOGGER.debug("get_devices called")
 
-        return [
-            Device(device_id=1, #el.find("input")["name"][-2:-1],
-                device_unique_id=self.get_device_unique_id(
-                    el.find("input")["name"][-2:-1],
-                    el.getText()[0:el.getText().find(" ")].lower()
-                ),
-                device_type=el.getText()[0:el.getText().find(" ")].lower(),
-                name=el.find("input")["value"], #.replace(" ", "_"),
-                state=self.get_device_value(
-                    el.find("input")["name"][-2:-1],
-                    el.getText()[0:el.getText().find(" ")].lower()
+        with self.stats.time("parse names"):
+            return [
+                # The channel number, so the device ids of a type are unique
+                Device(device_id=int(entry.channel),
+                    device_unique_id=self.get_device_unique_id(entry.channel, entry.device_type),
+                    device_type=entry.device_type,
+                    name=entry.name,
+                    # Filled in from the status page
+                    state=False,
                 )
-            )
-            for el in htmlContent.select("div#content p:not([class])")
-        ]
+                for entry in parse_names(content)
+            ]
     
-    def update_device_states(self, devices: list[Device]):
-        """Update the device states"""
-        htmlContent = BeautifulSoup(self.get_request("GET", "/cgi/status.cgi").read(), 'html.parser')
-
-        for dev in devices:
-            if dev.device_type == DeviceType.INPUT_SENSOR:
-                # Buf in the firmware HTML code - the state of the input is within the parent element
-                # i = int(dev.device_unique_id[-1:])
-                # el = htmlContent.find_all("input", { "id" : i })[0]
-                # dev.state = bool(int(el.getText()))
-                dev.state = False
-            if dev.device_type == DeviceType.OUTPUT_SENSOR:
-                i = int(dev.device_unique_id[-1:])
-                state = htmlContent.find("leds").find_all("led")[i].getText()
-                dev.state = bool(int(state))
-
-            _LOGGER.debug("Update DeviceStates for dev: %s", dev)
-
-    def get_device_info(self) -> VMDeviceInfo:
-        """Return the device info properties"""
-        htmlContent = BeautifulSoup(self.get_request("GET", "/about.html").read(), 'html.parser')
+    def parse_device_info(self, content: bytes) -> VMDeviceInfo:
+        """Parse the device info properties from the about page."""
+        with self.stats.time("parse about"):
+            about = parse_about(content)
         vmDeviceInfo = VMDeviceInfo()
-        vmDeviceInfo.name = htmlContent.find("h2").getText()
-        vmDeviceInfo.manufacturer = " ".join(htmlContent.find('div', { "id" : "footer" }).getText().split(" ")[-2:])
-        vmDeviceInfo.model = htmlContent.find("h1").getText()
-        vmDeviceInfo.version = htmlContent.find("p").getText().split(": ")[1]
+        vmDeviceInfo.name = about.name
+        vmDeviceInfo.manufacturer = about.manufacturer
+        vmDeviceInfo.model = about.model
+        vmDeviceInfo.version = about.version
         
         return vmDeviceInfo
 
@@ -174,17 +365,50 @@ class API:
             return f"OutputSensor{device_id}"
         return f"OtherSensor{device_id}"
 
-    def get_device_value(self, device_id: str, device_type: DeviceType) -> int | bool:
-        """Get device random value."""
-        if device_type == DeviceType.DOOR_SENSOR:
-            return choice([True, False])
-        if device_type == DeviceType.TEMP_SENSOR:
-            return randrange(15, 28)
-        if device_type == DeviceType.INPUT_SENSOR:
-            return False
-        if device_type == DeviceType.OUTPUT_SENSOR:
-            return False
-        return randrange(1, 10)
+    async def get_request(self, method, url) -> APIResponse:
+        """Perform a request on the board's keep-alive connection."""
+        return await self.connection.request(method, url)
+
+    async def connect(self) -> bool:
+        """Connect to api."""
+        return self.check_connect(await self.get_request("GET", "/"))
+
+    async def disconnect(self) -> bool:
+        """Disconnect from api."""
+        self.connected = False
+        await self.connection.close()
+        return True
+
+    async def probe(self) -> None:
+        """Check that the board accepts connections."""
+        await self.connection.probe()
+
+    async def get_devices(self) -> list[Device]:
+        """Get devices on api."""
+        return self.load_devices(self.check_response(await self.get_request("GET", NAMES_PAGE)))
+
+    async def get_status(self) -> StatusInfo:
+        """Return the relay output and input states."""
+        return self.load_status(self.check_response(await self.get_request("GET", STATUS_CGI)))
+
+    async def get_device_info(self) -> VMDeviceInfo:
+        """Return the device info properties"""
+        return self.load_device_info(self.check_response(await self.get_request("GET", ABOUT_PAGE)))
+
+    async def get_all(self) -> tuple[list[Device], VMDeviceInfo, StatusInfo]:
+        """Read the names, about and status pages concurrently.
+
+        When one request fails the others are cancelled, and its error is
+        raised rather than an ExceptionGroup.
+        """
+        try:
+            async with asyncio.TaskGroup() as group:
+                devices = group.create_task(self.get_devices())
+                info = group.create_task(self.get_device_info())
+                status = group.create_task(self.get_status())
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0] from None
+        return devices.result(), info.result(), status.result()
 
 
 class APIAuthError(Exception):
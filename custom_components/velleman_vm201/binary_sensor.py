@@ -1,20 +1,24 @@
 """Interfaces with the Velleman Integration sensors."""
 
+from datetime import datetime
 import logging
+from time import monotonic
 
 from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
     BinarySensorEntity,
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import MyConfigEntry
-from .api import Device, VMDeviceInfo, DeviceType
+from .api import VMDeviceInfo, DeviceType
 from .const import DOMAIN
 from .coordinator import VellemanCoordinator
+from .snapshot import Channel
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -43,9 +47,23 @@ async def async_setup_entry(
 
 
 class ExampleBinarySensor(CoordinatorEntity, BinarySensorEntity):
-    """Implementation of a sensor."""
-    
-    def __init__(self, coordinator: VellemanCoordinator, device: Device, deviceInfo: VMDeviceInfo) -> None:
+    """Implementation of a sensor.
+
+    With a debounce time or minimum publish interval configured, a new state is
+    held back until the channel settled and the interval passed. Only the last
+    state is published then; the transitions in between are counted as
+    suppressed.
+
+    While the board is unreachable within the grace period the last state is
+    kept, and the stale_since attribute tells since when.
+    """
+
+    # https://developers.home-assistant.io/docs/core/entity/binary-sensor#available-device-classes
+    _attr_device_class = BinarySensorDeviceClass.DOOR
+    # Add any additional attributes you want on your sensor.
+    _attr_extra_state_attributes = {"extra_info": "Extra Info"}
+
+    def __init__(self, coordinator: VellemanCoordinator, device: Channel, deviceInfo: VMDeviceInfo) -> None:
         """Initialise sensor."""
         super().__init__(coordinator)
         self.device = device
@@ -53,65 +71,102 @@ class ExampleBinarySensor(CoordinatorEntity, BinarySensorEntity):
         self.device_id = device.device_id
         self.coordinator = coordinator
 
+        # The published state, and the latest one read while it is held back
+        self._attr_is_on = coordinator.data.state(device)
+        self._latest = self._attr_is_on
+        self._transitions = 0
+        self._last_publish = 0.0
+        self._cancel_publish: CALLBACK_TYPE | None = None
+        # Publish right away after the entity was unavailable
+        self._stale = not coordinator.last_update_success
+        self._attr_extra_state_attributes = {
+            **self._attr_extra_state_attributes,
+            "suppressed_transitions": 0,
+            "stale_since": coordinator.stale_since,
+        }
+
+        # All entities must have a unique id.  Think carefully what you want this to be as
+        # changing it later will cause HA to create new entities.
+        self._attr_unique_id = f"{DOMAIN}-{device.device_unique_id}"
+
+        # Identifiers are what group entities into the same device.
+        # If your device is created elsewhere, you can just specify the indentifiers parameter.
+        # If your device connects via another device, add via_device parameter with the indentifiers of that device.
+        self._attr_device_info = DeviceInfo(
+            name=deviceInfo.name,
+            manufacturer=deviceInfo.manufacturer,
+            model=deviceInfo.model,
+            sw_version=deviceInfo.version,
+            identifiers={(DOMAIN, coordinator.board_id)},
+        )
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Update sensor with latest data from coordinator."""
         # This method is called by your DataUpdateCoordinator when a successful update runs.
         self.device = self.coordinator.get_device_by_unique_id(
-            self.device.device_type, self.device_id, self.device.device_unique_id
+            self.device.device_unique_id
         )
+        if not self.coordinator.last_update_success:
+            # Mark the entity unavailable right away
+            self._stale = True
+            self.async_write_ha_state()
+            return
+        if self._attr_extra_state_attributes["stale_since"] != self.coordinator.stale_since:
+            # The board became unreachable or is back, the state itself is kept
+            self._attr_extra_state_attributes["stale_since"] = self.coordinator.stale_since
+            self.async_write_ha_state()
+        # Only write the state when the channel changed since the last refresh
+        if not self.coordinator.data.changed & self.device.mask:
+            return
         _LOGGER.debug("Device: %s", self.device)
-        self.async_write_ha_state()
 
-    @property
-    def device_class(self) -> str:
-        """Return device class."""
-        # https://developers.home-assistant.io/docs/core/entity/binary-sensor#available-device-classes
-        return BinarySensorDeviceClass.DOOR
+        state = self.coordinator.data.state(self.device)
+        if state != self._latest:
+            self._transitions += 1
+        self._latest = state
+        delay = max(
+            self.coordinator.debounce,
+            self._last_publish + self.coordinator.min_publish_interval - monotonic(),
+        )
+        if self._stale or delay <= 0:
+            self._publish()
+        elif self.coordinator.debounce or self._cancel_publish is None:
+            # A change restarts the debounce time; the minimum interval only
+            # needs one publish scheduled at its end.
+            self._unschedule()
+            self._cancel_publish = async_call_later(self.hass, delay, self._async_publish_later)
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information."""
-        # Identifiers are what group entities into the same device.
-        # If your device is created elsewhere, you can just specify the indentifiers parameter.
-        # If your device connects via another device, add via_device parameter with the indentifiers of that device.
+    @callback
+    def _async_publish_later(self, _now: datetime) -> None:
+        self._cancel_publish = None
+        self._publish()
 
-        return DeviceInfo(
-            # name=f"ExampleDevice{self.device.device_id}",
-            name=self.deviceInfo.name,
-            manufacturer=self.deviceInfo.manufacturer,
-            model=self.deviceInfo.model,
-            sw_version=self.deviceInfo.version,
-            identifiers={
-                (
-                    DOMAIN,
-                    f"{self.coordinator.data.controller_name}-{self.device.device_id}",
-                )
-            },
-        )
+    @callback
+    def _publish(self) -> None:
+        """Write the latest state, counting the transitions that were not published."""
+        self._unschedule()
+        if self._transitions:
+            self._attr_extra_state_attributes["suppressed_transitions"] += (
+                self._transitions - (self._latest != self._attr_is_on)
+            )
+            self._transitions = 0
+        self._attr_is_on = self._latest
+        self._last_publish = monotonic()
+        self._stale = False
+        self.async_write_ha_state()
+
+    def _unschedule(self) -> None:
+        if self._cancel_publish is not None:
+            self._cancel_publish()
+            self._cancel_publish = None
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel a held back state."""
+        await super().async_will_remove_from_hass()
+        self._unschedule()
 
     @property
     def name(self) -> str:
         """Return the name of the sensor."""
         return self.device.name
-
-    @property
-    def is_on(self) -> bool | None:
-        """Return if the binary sensor is on."""
-        # This needs to enumerate to true or false
-        return self.device.state
-
-    @property
-    def unique_id(self) -> str:
-        """Return unique id."""
-        # All entities must have a unique id.  Think carefully what you want this to be as
-        # changing it later will cause HA to create new entities.
-        return f"{DOMAIN}-{self.device.device_unique_id}"
-
-    @property
-    def extra_state_attributes(self):
-        """Return the extra state attributes."""
-        # Add any additional attributes you want on your sensor.
-        attrs = {}
-        attrs["extra_info"] = "Extra Info"
-        return attrs
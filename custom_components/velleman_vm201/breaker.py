@@ -0,0 +1,87 @@
+"""Circuit breaker that stops polling unreachable VM201 boards."""
+
+from __future__ import annotations
+
+from enum import StrEnum
+import random
+from time import monotonic
+
+from .const import (
+    BREAKER_BASE_BACKOFF,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_MAX_BACKOFF,
+)
+
+
+class BreakerState(StrEnum):
+    """Circuit breaker states."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Track consecutive failures of a board and back off exponentially.
+
+    After failure_threshold consecutive failures the circuit opens and
+    requests are refused until the backoff expires. The next request is then
+    a probe: success closes the circuit, failure reopens it with a doubled
+    backoff.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        base_backoff: float = BREAKER_BASE_BACKOFF,
+        max_backoff: float = BREAKER_MAX_BACKOFF,
+    ) -> None:
+        """Initialise."""
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = BreakerState.CLOSED
+        self.failures: int = 0
+        self.opened: int = 0
+        self.backoff: float = 0.0
+        self._retry_at: float = 0.0
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds until the next probe is allowed."""
+        return max(0.0, self._retry_at - monotonic())
+
+    def allow_request(self) -> bool:
+        """Return True if the board may be contacted now."""
+        if self.state is BreakerState.OPEN and self.retry_in == 0:
+            self.state = BreakerState.HALF_OPEN
+        return self.state is not BreakerState.OPEN
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.backoff = 0.0
+
+    def record_failure(self) -> None:
+        """Count a failure and open the circuit once the threshold is reached."""
+        self.failures += 1
+        if self.state is BreakerState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.backoff = min(
+                self.max_backoff, self.backoff * 2 if self.backoff else self.base_backoff
+            )
+            if self.state is BreakerState.CLOSED:
+                self.opened += 1
+            self.state = BreakerState.OPEN
+            # Jitter keeps the probes of boards behind the same dead link apart
+            self._retry_at = monotonic() + self.backoff * random.uniform(0.9, 1.1)
+
+    def as_dict(self) -> dict[str, str | int | float]:
+        """Return the breaker state, for diagnostics."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.opened,
+            "backoff": self.backoff,
+            "retry_in": self.retry_in,
+        }
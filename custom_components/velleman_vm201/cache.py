@@ -0,0 +1,71 @@
+"""Persistent cache of the discovered board topology."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .api import Device, VMDeviceInfo
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+
+
+def serialize_topology(devices: list[Device], deviceInfo: VMDeviceInfo) -> dict[str, Any]:
+    """Return the stored form of the devices and board info, without states."""
+    return {
+        "devices": [
+            {
+                "device_id": device.device_id,
+                "device_unique_id": device.device_unique_id,
+                "device_type": device.device_type,
+                "name": device.name,
+            }
+            for device in devices
+        ],
+        "device_info": {
+            "name": deviceInfo.name,
+            "manufacturer": deviceInfo.manufacturer,
+            "model": deviceInfo.model,
+            "version": deviceInfo.version,
+        },
+    }
+
+
+class TopologyCache:
+    """Store the device list and board info of a config entry on disk."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialise."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.topology"
+        )
+        self.stored: dict[str, Any] | None = None
+
+    async def async_load(self) -> tuple[list[Device], VMDeviceInfo] | None:
+        """Return the cached devices and board info, if any."""
+        if (data := await self._store.async_load()) is None:
+            return None
+        self.stored = data
+
+        # The states are not cached, they are unknown until the first live refresh.
+        devices = [Device(**device, state=False) for device in data["devices"]]
+        deviceInfo = VMDeviceInfo()
+        for key, value in data["device_info"].items():
+            setattr(deviceInfo, key, value)
+        return devices, deviceInfo
+
+    async def async_save(self, devices: list[Device], deviceInfo: VMDeviceInfo) -> bool:
+        """Store the topology, return False if it did not change."""
+        data = serialize_topology(devices, deviceInfo)
+        if data == self.stored:
+            return False
+        self.stored = data
+        await self._store.async_save(data)
+        return True
+
+    async def async_remove(self) -> None:
+        """Remove the cache file."""
+        await self._store.async_remove()
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+import re
 from typing import Any
 
 import voluptuous as vol
@@ -17,13 +18,52 @@ from homeassistant.const import (
     CONF_HOST,
     CONF_PASSWORD,
     CONF_SCAN_INTERVAL,
+    CONF_TIMEOUT,
     CONF_USERNAME,
 )
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
 
-from .api import API, APIAuthError, APIConnectionError
-from .const import DEFAULT_SCAN_INTERVAL, DOMAIN, MIN_SCAN_INTERVAL
+from .api import AsyncAPI, APIAuthError, APIConnectionError, VMDeviceInfo
+from .const import (
+    CONF_ADAPTIVE_POLLING,
+    CONF_CONNECT_TIMEOUT,
+    CONF_CONTROLLER_NAME,
+    CONF_DEBOUNCE,
+    CONF_FAST_SCAN_INTERVAL,
+    CONF_IDLE_SCAN_INTERVAL,
+    CONF_INPUT_SAMPLE_INTERVAL,
+    CONF_MAX_CONNECTIONS,
+    CONF_MIN_PUBLISH_INTERVAL,
+    CONF_NETWORK,
+    CONF_PROTOCOL_PORT,
+    CONF_PUSH_UPDATES,
+    CONF_STALE_GRACE_PERIOD,
+    CONF_TOPOLOGY_INTERVAL,
+    DEFAULT_ADAPTIVE_POLLING,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_CONTROLLER_NAME,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_FAST_SCAN_INTERVAL,
+    DEFAULT_IDLE_SCAN_INTERVAL,
+    DEFAULT_INPUT_SAMPLE_INTERVAL,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MIN_PUBLISH_INTERVAL,
+    DEFAULT_PROTOCOL_PORT,
+    DEFAULT_PUSH_UPDATES,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STALE_GRACE_PERIOD,
+    DEFAULT_TIMEOUT,
+    DEFAULT_TOPOLOGY_INTERVAL,
+    DOMAIN,
+    MAX_MAX_CONNECTIONS,
+    MIN_FAST_SCAN_INTERVAL,
+    MIN_INPUT_SAMPLE_INTERVAL,
+    MIN_SCAN_INTERVAL,
+    MIN_TIMEOUT,
+    MIN_TOPOLOGY_INTERVAL,
+)
+from .discovery import NetworkTooLarge, async_discover, is_vm201, scan_hosts
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -35,44 +75,68 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+# The scan sends no credentials, they are asked for once a board was picked
+STEP_SCAN_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NETWORK, description={"suggested_value": "192.168.1.0/24"}): str,
+    }
+)
+
+
+def controller_name(host: str) -> str:
+    """Return the controller name of a new board, unique per address."""
+    return f"{DEFAULT_CONTROLLER_NAME}_" + re.sub(r"\W", "_", host)
+
 
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
     """
-    # TODO validate the data can be used to set up a connection.
-
-    # If your PyPI package is not built with async, pass your methods
-    # to the executor:
-    # await hass.async_add_executor_job(
-    #     your_validate_func, data[CONF_USERNAME], data[CONF_PASSWORD]
-    # )
-
     # Check if username / password was entered
     if (data[CONF_USERNAME] is not None and data[CONF_PASSWORD] is not None):
-        api = API(data[CONF_HOST], data[CONF_USERNAME], data[CONF_PASSWORD])
+        api = AsyncAPI(data[CONF_HOST], data[CONF_USERNAME], data[CONF_PASSWORD])
     else:
-        api = API(data[CONF_HOST])
-
+        api = AsyncAPI(data[CONF_HOST])
 
-    
     try:
-        await hass.async_add_executor_job(api.connect)
+        await api.connect()
         # If you cannot connect, raise CannotConnect
         # If the authentication is wrong, raise InvalidAuth
     except APIAuthError as err:
         raise InvalidAuth from err
     except APIConnectionError as err:
         raise CannotConnect from err
+    finally:
+        await api.disconnect()
     return {"title": f"Velleman VM201 - {data[CONF_HOST]}"}
 
 
+async def validate_discovered(hass: HomeAssistant, data: dict[str, Any]) -> None:
+    """Validate the credentials for a board found by the scan and that it is a VM201.
+
+    A board with a password only answered 401 to the scan, so this is the
+    first time its about page is read.
+    """
+    api = AsyncAPI(data[CONF_HOST], data.get(CONF_USERNAME), data.get(CONF_PASSWORD))
+    try:
+        info = await api.get_device_info()
+    except APIAuthError as err:
+        raise InvalidAuth from err
+    except APIConnectionError as err:
+        raise CannotConnect from err
+    finally:
+        await api.disconnect()
+    if not is_vm201(info):
+        raise NotABoard
+
+
 class VellemanConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Velleman VM201."""
 
-    VERSION = 1
-    _input_data: dict[str, Any]
+    # Version 2: unique ids made from the host, see async_migrate_entry
+    VERSION = 2
+    _discovered: dict[str, VMDeviceInfo | None]
 
     @staticmethod
     @callback
@@ -87,6 +151,12 @@ class VellemanConfigFlow(ConfigFlow, domain=DOMAIN):
     ) -> ConfigFlowResult:
         """Handle the initial step."""
         # Called when you initiate adding an integration via the UI
+        return self.async_show_menu(step_id="user", menu_options=["scan", "manual"])
+
+    async def async_step_manual(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Add a board by its address."""
         errors: dict[str, str] = {}
 
         if user_input is not None:
@@ -106,13 +176,100 @@ class VellemanConfigFlow(ConfigFlow, domain=DOMAIN):
             if "base" not in errors:
                 # Validation was successful, so create a unique id for this instance of your integration
                 # and create the config entry.
-                await self.async_set_unique_id(info.get("title"))
+                name = controller_name(user_input[CONF_HOST])
+                await self.async_set_unique_id(name)
                 self._abort_if_unique_id_configured()
-                return self.async_create_entry(title=info["title"], data=user_input)
+                return self.async_create_entry(
+                    title=info["title"], data=user_input | {CONF_CONTROLLER_NAME: name}
+                )
 
         # Show initial form.
         return self.async_show_form(
-            step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+            step_id="manual", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+        )
+
+    async def async_step_scan(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Scan a network for boards that are not configured yet."""
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            configured = {
+                entry.data[CONF_HOST].partition(":")[0]
+                for entry in self._async_current_entries(include_ignore=False)
+            }
+            try:
+                hosts = scan_hosts(user_input[CONF_NETWORK], configured)
+            except NetworkTooLarge:
+                errors[CONF_NETWORK] = "network_too_large"
+            except ValueError:
+                errors[CONF_NETWORK] = "invalid_network"
+            else:
+                boards = await async_discover(hosts)
+                self._discovered = {board.host: board.info for board in boards}
+                if self._discovered:
+                    return await self.async_step_select_board()
+                errors["base"] = "no_boards_found"
+
+        return self.async_show_form(
+            step_id="scan",
+            data_schema=self.add_suggested_values_to_schema(STEP_SCAN_DATA_SCHEMA, user_input),
+            errors=errors,
+        )
+
+    async def async_step_select_board(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Add one of the boards found by the scan, with its credentials."""
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            data = {
+                CONF_HOST: user_input[CONF_HOST],
+                CONF_USERNAME: user_input.get(CONF_USERNAME),
+                CONF_PASSWORD: user_input.get(CONF_PASSWORD),
+                CONF_CONTROLLER_NAME: controller_name(user_input[CONF_HOST]),
+            }
+            try:
+                # The credentials are only ever sent to the board that was picked
+                await validate_discovered(self.hass, data)
+            except CannotConnect:
+                errors["base"] = "cannot_connect"
+            except InvalidAuth:
+                errors["base"] = "invalid_auth"
+            except NotABoard:
+                errors["base"] = "not_a_board"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected exception")
+                errors["base"] = "unknown"
+            else:
+                await self.async_set_unique_id(data[CONF_CONTROLLER_NAME])
+                self._abort_if_unique_id_configured()
+                return self.async_create_entry(
+                    title=f"Velleman VM201 - {data[CONF_HOST]}", data=data
+                )
+
+        boards = {
+            host: f"{host} - {info.name} ({info.model}, firmware {info.version})"
+            if info is not None
+            else f"{host} - login required"
+            for host, info in self._discovered.items()
+        }
+        return self.async_show_form(
+            step_id="select_board",
+            data_schema=self.add_suggested_values_to_schema(
+                vol.Schema(
+                    {
+                        vol.Required(CONF_HOST): vol.In(boards),
+                        vol.Optional(CONF_USERNAME): str,
+                        vol.Optional(CONF_PASSWORD): str,
+                    }
+                ),
+                user_input,
+            ),
+            errors=errors,
+            description_placeholders={"count": str(len(boards))},
         )
 
     async def async_step_reconfigure(
@@ -187,6 +344,67 @@ class VellemanOptionsFlowHandler(OptionsFlow):
                     CONF_SCAN_INTERVAL,
                     default=self.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
                 ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))),
+                vol.Required(
+                    CONF_TIMEOUT,
+                    default=self.options.get(CONF_TIMEOUT, DEFAULT_TIMEOUT),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_TIMEOUT))),
+                vol.Required(
+                    CONF_CONNECT_TIMEOUT,
+                    default=self.options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_TIMEOUT))),
+                vol.Required(
+                    CONF_MAX_CONNECTIONS,
+                    default=self.options.get(CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=1, max=MAX_MAX_CONNECTIONS))),
+                vol.Required(
+                    CONF_TOPOLOGY_INTERVAL,
+                    default=self.options.get(CONF_TOPOLOGY_INTERVAL, DEFAULT_TOPOLOGY_INTERVAL),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_TOPOLOGY_INTERVAL))),
+                vol.Required(
+                    CONF_STALE_GRACE_PERIOD,
+                    default=self.options.get(CONF_STALE_GRACE_PERIOD, DEFAULT_STALE_GRACE_PERIOD),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=0))),
+                vol.Required(
+                    CONF_ADAPTIVE_POLLING,
+                    default=self.options.get(CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING),
+                ): bool,
+                vol.Required(
+                    CONF_FAST_SCAN_INTERVAL,
+                    default=self.options.get(CONF_FAST_SCAN_INTERVAL, DEFAULT_FAST_SCAN_INTERVAL),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_FAST_SCAN_INTERVAL))),
+                vol.Required(
+                    CONF_IDLE_SCAN_INTERVAL,
+                    default=self.options.get(CONF_IDLE_SCAN_INTERVAL, DEFAULT_IDLE_SCAN_INTERVAL),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))),
+                vol.Required(
+                    CONF_PUSH_UPDATES,
+                    default=self.options.get(CONF_PUSH_UPDATES, DEFAULT_PUSH_UPDATES),
+                ): bool,
+                vol.Required(
+                    CONF_PROTOCOL_PORT,
+                    default=self.options.get(CONF_PROTOCOL_PORT, DEFAULT_PROTOCOL_PORT),
+                ): (vol.All(vol.Coerce(int), vol.Range(min=1, max=65535))),
+                vol.Required(
+                    CONF_INPUT_SAMPLE_INTERVAL,
+                    default=self.options.get(
+                        CONF_INPUT_SAMPLE_INTERVAL, DEFAULT_INPUT_SAMPLE_INTERVAL
+                    ),
+                ): (
+                    vol.All(
+                        vol.Coerce(float),
+                        vol.Any(0, vol.Clamp(min=MIN_INPUT_SAMPLE_INTERVAL)),
+                    )
+                ),
+                vol.Required(
+                    CONF_DEBOUNCE,
+                    default=self.options.get(CONF_DEBOUNCE, DEFAULT_DEBOUNCE),
+                ): (vol.All(vol.Coerce(float), vol.Clamp(min=0))),
+                vol.Required(
+                    CONF_MIN_PUBLISH_INTERVAL,
+                    default=self.options.get(
+                        CONF_MIN_PUBLISH_INTERVAL, DEFAULT_MIN_PUBLISH_INTERVAL
+                    ),
+                ): (vol.All(vol.Coerce(float), vol.Clamp(min=0))),
             }
         )
 
@@ -199,3 +417,7 @@ class CannotConnect(HomeAssistantError):
 
 class InvalidAuth(HomeAssistantError):
     """Error to indicate there is invalid auth."""
+
+
+class NotABoard(HomeAssistantError):
+    """Error to indicate the host is not a VM201."""
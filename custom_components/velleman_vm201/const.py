@@ -1,6 +1,97 @@
 """Constants for the Integration 101 Template integration."""
 
 DOMAIN = "velleman_vm201"
+DATA_HUB = f"{DOMAIN}_hub"
+
+# Prefix of the unique ids of a board's channels, made from the host. Version
+# 1 config entries shared the default and are migrated on setup.
+CONF_CONTROLLER_NAME = "controller_name"
+DEFAULT_CONTROLLER_NAME = "VM201"
 
 DEFAULT_SCAN_INTERVAL = 60
 MIN_SCAN_INTERVAL = 10
+
+DEFAULT_TIMEOUT = 10
+MIN_TIMEOUT = 1
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+DEFAULT_CONNECT_TIMEOUT = 3
+
+CONF_TOPOLOGY_INTERVAL = "topology_interval"
+DEFAULT_TOPOLOGY_INTERVAL = 3600
+MIN_TOPOLOGY_INTERVAL = 60
+
+# Adaptive polling: poll on the fast interval for a while after a channel
+# changed, and drop to the idle interval once the board has been quiet.
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_FAST_SCAN_INTERVAL = "fast_scan_interval"
+CONF_IDLE_SCAN_INTERVAL = "idle_scan_interval"
+DEFAULT_ADAPTIVE_POLLING = False
+DEFAULT_FAST_SCAN_INTERVAL = 1
+DEFAULT_IDLE_SCAN_INTERVAL = 300
+MIN_FAST_SCAN_INTERVAL = 1
+FAST_POLL_PERIOD = 60
+IDLE_AFTER = 900
+
+# Number of boards the hub polls at the same time
+MAX_CONCURRENT_POLLS = 4
+
+# Circuit breaker: stop polling a board after this many consecutive failures
+# and probe it again after a backoff that doubles up to the maximum (seconds).
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_BACKOFF = 15
+BREAKER_MAX_BACKOFF = 600
+
+# Grace period (seconds, 0 = off): after a failed refresh the last good data
+# is kept while the board is retried with a growing, jittered delay, and the
+# entities only become unavailable once the board failed for this long.
+CONF_STALE_GRACE_PERIOD = "stale_grace_period"
+DEFAULT_STALE_GRACE_PERIOD = 0
+STALE_RETRY_MIN_DELAY = 1
+
+# Relay commands issued within this window (seconds) are sent as one request
+COMMAND_COALESCE_WINDOW = 0.05
+
+# Push updates over the TCP control protocol of the board, polling the web
+# pages only while that connection is down. The relays are switched over the
+# same connection, so the switches are only created with push updates.
+CONF_PUSH_UPDATES = "push_updates"
+CONF_PROTOCOL_PORT = "protocol_port"
+DEFAULT_PUSH_UPDATES = False
+DEFAULT_PROTOCOL_PORT = 9760
+
+# Inputs: read the status page this often (seconds, 0 disables it) between
+# refreshes so short pulses are not missed; the last edges are kept per input.
+# Every sample takes one of the poll slots of the hub, so faster sampling
+# would starve the refreshes of the other boards.
+CONF_INPUT_SAMPLE_INTERVAL = "input_sample_interval"
+DEFAULT_INPUT_SAMPLE_INTERVAL = 0
+MIN_INPUT_SAMPLE_INTERVAL = 1
+INPUT_EDGE_CAPACITY = 256
+
+# Binary sensors publish a new state only once the channel has been stable for
+# the debounce time, and at most once per minimum interval (seconds, 0 = off).
+CONF_DEBOUNCE = "debounce"
+CONF_MIN_PUBLISH_INTERVAL = "min_publish_interval"
+DEFAULT_DEBOUNCE = 0
+DEFAULT_MIN_PUBLISH_INTERVAL = 0
+
+# Requests the integration sends to one board at the same time. The firmware
+# only serves a few HTTP sockets; set this to 1 for boards that serve one.
+CONF_MAX_CONNECTIONS = "max_connections"
+DEFAULT_MAX_CONNECTIONS = 2
+MAX_MAX_CONNECTIONS = 4
+
+# Network scan of the config flow: boards probed at the same time, the largest
+# network that may be scanned and the per-board timeouts (seconds).
+CONF_NETWORK = "network"
+DISCOVERY_CONCURRENCY = 64
+DISCOVERY_MAX_HOSTS = 1024
+DISCOVERY_CONNECT_TIMEOUT = 1
+DISCOVERY_TIMEOUT = 3
+
+# Relay statistics: the duty cycle covers this window (seconds), the counters
+# are saved at most once per delay and the sensors of relays that are on are
+# updated on this interval (seconds).
+RUNTIME_DUTY_WINDOW = 86400
+RUNTIME_SAVE_DELAY = 60
+RUNTIME_UPDATE_INTERVAL = 60
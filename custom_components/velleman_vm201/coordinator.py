@@ -1,32 +1,95 @@
 """Velleman VM201 integration using DataUpdateCoordinator."""
 
-from dataclasses import dataclass
-from datetime import timedelta
+import asyncio
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
 import logging
+import random
+from time import monotonic, perf_counter, time
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     CONF_HOST,
     CONF_PASSWORD,
     CONF_SCAN_INTERVAL,
+    CONF_TIMEOUT,
     CONF_USERNAME,
 )
-from homeassistant.core import DOMAIN, HomeAssistant
+from homeassistant.core import DOMAIN, HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .api import API, APIAuthError, Device, VMDeviceInfo, DeviceType
-from .const import DEFAULT_SCAN_INTERVAL
+from .api import AsyncAPI, APIAuthError, APIConnectionError, Device, VMDeviceInfo, DeviceType
+from .breaker import BreakerState, CircuitBreaker
+from .cache import TopologyCache
+from .const import (
+    CONF_ADAPTIVE_POLLING,
+    CONF_CONNECT_TIMEOUT,
+    CONF_CONTROLLER_NAME,
+    CONF_DEBOUNCE,
+    CONF_FAST_SCAN_INTERVAL,
+    CONF_IDLE_SCAN_INTERVAL,
+    CONF_INPUT_SAMPLE_INTERVAL,
+    CONF_MAX_CONNECTIONS,
+    CONF_MIN_PUBLISH_INTERVAL,
+    CONF_PROTOCOL_PORT,
+    CONF_PUSH_UPDATES,
+    CONF_STALE_GRACE_PERIOD,
+    CONF_TOPOLOGY_INTERVAL,
+    COMMAND_COALESCE_WINDOW,
+    DEFAULT_ADAPTIVE_POLLING,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_FAST_SCAN_INTERVAL,
+    DEFAULT_IDLE_SCAN_INTERVAL,
+    DEFAULT_INPUT_SAMPLE_INTERVAL,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MIN_PUBLISH_INTERVAL,
+    DEFAULT_PROTOCOL_PORT,
+    DEFAULT_PUSH_UPDATES,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STALE_GRACE_PERIOD,
+    DEFAULT_TIMEOUT,
+    DEFAULT_TOPOLOGY_INTERVAL,
+    FAST_POLL_PERIOD,
+    IDLE_AFTER,
+    MIN_INPUT_SAMPLE_INTERVAL,
+    STALE_RETRY_MIN_DELAY,
+)
+from .edges import EdgeBuffer
+from .hub import get_hub
+from .protocol import ProtocolClient, StatusPacket
+from .runtime import RelayRuntimeTracker
+from .snapshot import BoardSnapshot, Channel, ChannelTable
 
 _LOGGER = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class VellemanAPIData:
-    """Class to hold api data."""
+    """Class to hold api data.
+
+    A new instance is swapped in on every refresh that changed something, so
+    readers never see a half-updated board.
+    """
 
     controller_name: str
-    devices: list[Device]
+    snapshot: BoardSnapshot
     deviceInfo: VMDeviceInfo
+    # Mask of the channels whose name or state differs from the previous refresh
+    changed: int = 0
+    # Time (epoch) of the first failed refresh while these are the last good states
+    stale_since: float | None = None
+
+    @property
+    def devices(self) -> tuple[Channel, ...]:
+        """Return the channels of the board."""
+        return self.snapshot.table.channels
+
+    def state(self, channel: Channel) -> bool:
+        """Return the state of a channel."""
+        return self.snapshot.state(channel)
 
 
 class VellemanCoordinator(DataUpdateCoordinator):
@@ -44,6 +107,44 @@ class VellemanCoordinator(DataUpdateCoordinator):
         self.poll_interval = config_entry.options.get(
             CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL
         )
+        self.timeout = config_entry.options.get(CONF_TIMEOUT, DEFAULT_TIMEOUT)
+        self.connect_timeout = config_entry.options.get(
+            CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT
+        )
+        # The device names and board info rarely change, so they are only
+        # refreshed on this slower interval or when explicitly requested.
+        self.topology_interval = config_entry.options.get(
+            CONF_TOPOLOGY_INTERVAL, DEFAULT_TOPOLOGY_INTERVAL
+        )
+        self._topology_updated: float | None = None
+        self._topology_requested = False
+        # Device list the channel table was last built from
+        self._devices: list[Device] | None = None
+        # The topology is cached on disk so entities can be set up before the board answers
+        self.entry_id = config_entry.entry_id
+        self.topology_cache = TopologyCache(hass, config_entry.entry_id)
+        self._setup_from_cache = False
+
+        # Adaptive polling switches between the fast, normal and idle interval
+        # depending on how long ago a channel last changed.
+        self.adaptive_polling = config_entry.options.get(
+            CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING
+        )
+        self.fast_poll_interval = config_entry.options.get(
+            CONF_FAST_SCAN_INTERVAL, DEFAULT_FAST_SCAN_INTERVAL
+        )
+        self.idle_poll_interval = config_entry.options.get(
+            CONF_IDLE_SCAN_INTERVAL, DEFAULT_IDLE_SCAN_INTERVAL
+        )
+        # Start on the idle interval, a restart is no activity of the board;
+        # the first change it shows switches to fast polling.
+        self._last_activity = monotonic() - IDLE_AFTER
+
+        # Throttling of the state writes of the binary sensors
+        self.debounce = config_entry.options.get(CONF_DEBOUNCE, DEFAULT_DEBOUNCE)
+        self.min_publish_interval = config_entry.options.get(
+            CONF_MIN_PUBLISH_INTERVAL, DEFAULT_MIN_PUBLISH_INTERVAL
+        )
 
         # Initialise DataUpdateCoordinator
         super().__init__(
@@ -55,43 +156,408 @@ class VellemanCoordinator(DataUpdateCoordinator):
             # Polling interval. Will only be polled if there are subscribers.
             # Using config option here but you can just use a value.
             update_interval=timedelta(seconds=self.poll_interval),
+            # Allow a confirmatory refresh right after a command was sent.
+            request_refresh_debouncer=Debouncer(
+                hass, _LOGGER, cooldown=self.fast_poll_interval, immediate=True
+            ),
         )
 
         # Initialise your api here
-        self.api = API(host=self.host, user=self.user, pwd=self.pwd)
+        self.api = AsyncAPI(
+            host=self.host,
+            user=self.user,
+            pwd=self.pwd,
+            timeout=self.timeout,
+            connect_timeout=self.connect_timeout,
+            max_connections=config_entry.options.get(CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS),
+            controller_name=config_entry.data[CONF_CONTROLLER_NAME],
+        )
+        # Stops polling an unreachable board until a probe succeeds again
+        self.breaker = CircuitBreaker()
+        # How long the last good data is served while refreshes fail
+        self.grace_period = config_entry.options.get(
+            CONF_STALE_GRACE_PERIOD, DEFAULT_STALE_GRACE_PERIOD
+        )
+        self._failing_since: float | None = None
+        self._stale_retries = 0
+
+        # All boards share one hub that staggers and limits their polls
+        self.hub_key = config_entry.entry_id
+        self.hub = get_hub(hass)
+        self.hub.register(self.hub_key, self)
+        self._phase_pending = True
+
+        # Timings and counters of the poll path, shared with the api
+        self.stats = self.api.stats
+
+        # Status changes pushed over the control protocol; the web pages are
+        # polled at the normal rate only while that connection is down.
+        self.push: ProtocolClient | None = None
+        if config_entry.options.get(CONF_PUSH_UPDATES, DEFAULT_PUSH_UPDATES):
+            self.push = ProtocolClient(
+                self.host,
+                config_entry.options.get(CONF_PROTOCOL_PORT, DEFAULT_PROTOCOL_PORT),
+                self.user,
+                self.pwd,
+                on_status=self._handle_push_status,
+                on_connection=self._handle_push_connection,
+                connect_timeout=self.connect_timeout,
+                stats=self.stats,
+            )
+
+        # Edges of the inputs, by unique id. They are captured from every
+        # status read, and from extra reads of the status page when sampling.
+        self.input_edges: dict[str, EdgeBuffer] = {}
+        self.input_sample_interval = config_entry.options.get(
+            CONF_INPUT_SAMPLE_INTERVAL, DEFAULT_INPUT_SAMPLE_INTERVAL
+        )
+        if self.input_sample_interval:
+            # Options saved before the minimum was raised may be below it
+            self.input_sample_interval = max(self.input_sample_interval, MIN_INPUT_SAMPLE_INTERVAL)
+        # Runtime, switch count and duty cycle of the relays, from the same snapshots
+        self.relay_runtime = RelayRuntimeTracker(hass, config_entry.entry_id)
+
+        # Relay states requested by the switches, sent together after a short window
+        self._pending_outputs: dict[int, bool] = {}
+        self._outputs_sent: asyncio.Future[None] | None = None
+
+    @property
+    def topology_due(self) -> bool:
+        """Return True if the device list and board info need to be fetched."""
+        return (
+            self.data is None
+            or self._topology_requested
+            or self._topology_updated is None
+            or monotonic() - self._topology_updated >= self.topology_interval
+        )
+
+    async def async_load_cached_topology(self) -> bool:
+        """Use the cached topology as data until the first live refresh.
+
+        The entities are created from it but stay unavailable until the board
+        has answered, as the channel states are not cached.
+        """
+        if (cached := await self.topology_cache.async_load()) is None:
+            return False
+        devices, deviceInfo = cached
+        self.data = VellemanAPIData(
+            self.api.controller_name, BoardSnapshot(ChannelTable(devices)), deviceInfo
+        )
+        self.last_update_success = False
+        self._setup_from_cache = True
+        return True
+
+    async def _async_topology_fetched(self, devices: list[Device], deviceInfo: VMDeviceInfo) -> None:
+        """Store a freshly read topology and reload if it differs from the one set up."""
+        cached = self.topology_cache.stored
+        if not await self.topology_cache.async_save(devices, deviceInfo):
+            return
+        if self._setup_from_cache and {
+            device["device_unique_id"] for device in cached["devices"]
+        } != {device.device_unique_id for device in devices}:
+            _LOGGER.info("Channels of %s changed since the last start, reloading", self.host)
+            self.hass.config_entries.async_schedule_reload(self.entry_id)
+
+    async def async_request_topology_refresh(self) -> None:
+        """Re-read the device list and board info on the next refresh."""
+        self._topology_requested = True
+        await self.async_request_refresh()
+
+    @property
+    def board_id(self) -> str:
+        """Return the identifier of the board in the device registry."""
+        return self.api.controller_name
+
+    @property
+    def stale_since(self) -> datetime | None:
+        """Return since when the board could not be read, while its last states are kept."""
+        if self.data is None or self.data.stale_since is None:
+            return None
+        return dt_util.utc_from_timestamp(self.data.stale_since)
+
+    @property
+    def current_poll_interval(self) -> int:
+        """Return the interval for the next poll based on channel activity."""
+        if self.push is not None and self.push.connected:
+            # Only the topology needs polling while the board pushes its states
+            return self.topology_interval
+        if not self.adaptive_polling:
+            return self.poll_interval
+        quiet = monotonic() - self._last_activity
+        if quiet < FAST_POLL_PERIOD:
+            return self.fast_poll_interval
+        if quiet >= IDLE_AFTER:
+            return self.idle_poll_interval
+        return self.poll_interval
+
+    async def async_set_output(self, channel: int, state: bool) -> None:
+        """Switch a relay output, coalescing commands issued close together."""
+        self._pending_outputs[channel] = state
+        if self._outputs_sent is None:
+            self._outputs_sent = self.hass.loop.create_future()
+            self.hass.async_create_task(self._async_send_outputs())
+        await asyncio.shield(self._outputs_sent)
+
+    async def _async_send_outputs(self) -> None:
+        """Send all pending relay states over the control protocol.
+
+        The web interface has no documented command CGI, so the relays are
+        only switched while the push connection is up.
+        """
+        await asyncio.sleep(COMMAND_COALESCE_WINDOW)
+        pending, self._pending_outputs = self._pending_outputs, {}
+        sent, self._outputs_sent = self._outputs_sent, None
+
+        on_mask = sum(1 << channel for channel, state in pending.items() if state)
+        off_mask = sum(1 << channel for channel, state in pending.items() if not state)
+        try:
+            if self.push is None:
+                raise APIConnectionError(f"Push updates are not enabled for {self.host}")
+            await self.push.set_outputs(on_mask, off_mask)
+        except Exception as err:  # pylint: disable=broad-except
+            sent.set_exception(err)
+            # Consume the exception in case all waiting switches were cancelled
+            sent.exception()
+            return
+        sent.set_result(None)
+        # Read the states back even though the board pushes them, as it pushes
+        # nothing for a command that changed no relay. The refresh updates all
+        # listeners, so the switches drop their assumed state either way.
+        # Confirm in a separate task so the waiting switches resume first.
+        self.hass.async_create_task(self.async_command_sent())
+
+    async def async_command_sent(self) -> None:
+        """Switch to fast polling and confirm a command sent to the board."""
+        self._last_activity = monotonic()
+        await self.async_request_refresh()
 
     async def async_update_data(self):
         """Fetch data from API endpoint.
 
-        This is the place to pre-process the data to lookup tables
-        so entities can quickly look up their data.
+        A regular poll only reads the status page and updates the known
+        devices; the names and about pages are read when the topology is due.
+        The pages are requested concurrently, as far as the board allows.
         """
+        # Fail fast while the circuit is open, without touching the network
+        if not self.breaker.allow_request():
+            self.update_interval = timedelta(
+                seconds=max(self.current_poll_interval, self.breaker.retry_in)
+            )
+            return self._stale_data(
+                f"{self.host} is unreachable, next probe in {self.breaker.retry_in:.0f}s"
+            )
+
+        topology_fetched = False
+        previous = self.data.snapshot if self.data is not None else None
+        table = previous.table if previous is not None else None
+        start = perf_counter()
         try:
-            if not self.api.connected:
-                await self.hass.async_add_executor_job(self.api.connect)
-            devices = await self.hass.async_add_executor_job(self.api.get_devices)
-            #await self.hass.async_add_executor_job(self.api.update_device_states(devices))
-            deviceInfo = await self.hass.async_add_executor_job(self.api.get_device_info)
+            async with self.hub.poll_slot():
+                start = perf_counter()
+                if self.breaker.state is BreakerState.HALF_OPEN:
+                    # A cheap connect only; it is reused by the requests below
+                    await self.api.probe()
+                # No separate connectivity check, any page read proves the board is reachable
+                if self.topology_due:
+                    devices, deviceInfo, status = await self.api.get_all()
+                    topology_fetched = True
+                else:
+                    deviceInfo = self.data.deviceInfo
+                    status = await self.api.get_status()
+            # The table is shared by all snapshots until the channels are renamed
+            if topology_fetched and devices is not self._devices:
+                if not (fetched := ChannelTable(devices)).same_channels(table):
+                    table = fetched
+            # A status page that does not cover the channels of the names page
+            # fails the refresh, and counts for the breaker, like a lost board
+            snapshot = BoardSnapshot(table, table.states(status.outputs, status.inputs))
         except APIAuthError as err:
+            self.stats.add_poll(perf_counter() - start, False)
             _LOGGER.error(err)
             raise UpdateFailed(err) from err
         except Exception as err:
-            # This will show entities as unavailable by raising UpdateFailed exception
-            raise UpdateFailed(f"Error communicating with API: {err}") from err
+            self.stats.add_poll(perf_counter() - start, False)
+            self.breaker.record_failure()
+            if self.breaker.state is BreakerState.OPEN:
+                self.update_interval = timedelta(seconds=self.breaker.retry_in)
+            return self._stale_data(f"Error communicating with API: {err}", err)
+        self.stats.add_poll(perf_counter() - start, True)
+        self.breaker.record_success()
+        self._failing_since = None
+        self._stale_retries = 0
+        if topology_fetched:
+            self._topology_updated = monotonic()
+            self._topology_requested = False
+            self._devices = devices
+            await self._async_topology_fetched(devices, deviceInfo)
+        self._record_snapshot(snapshot)
+        if previous is None or not self.last_update_success:
+            # After a failed refresh every entity has to write its state again.
+            changed = table.all_mask
+        elif changed := snapshot.changed(previous):
+            self._last_activity = monotonic()
+        # The next refresh is scheduled with this interval once we return.
+        self.update_interval = timedelta(seconds=self._next_interval())
+
+        if (
+            previous is not None
+            and self.last_update_success
+            and not changed
+            and deviceInfo is self.data.deviceInfo
+            and self.data.stale_since is None
+        ):
+            # Nothing changed on the board, keep the data; the channel
+            # entities skip their state writes as no channel is marked changed
+            return replace(self.data, changed=0) if self.data.changed else self.data
 
         # What is returned here is stored in self.data by the DataUpdateCoordinator
-        return VellemanAPIData(self.api.controller_name, devices, deviceInfo)
+        return VellemanAPIData(self.api.controller_name, snapshot, deviceInfo, changed)
 
-    def get_device_by_unique_id(
-        self, device_type: DeviceType, device_id: int, device_unique_id: int
-    ) -> Device | None:
-        """Return device by device id."""
-        # Called by the binary sensors and sensors to get their updated data from self.data
+    def _stale_data(self, message: str, err: Exception | None = None) -> VellemanAPIData:
+        """Return the last good data while the grace period lasts, else raise UpdateFailed.
+
+        The stale data has no changed channels, so the entities keep their
+        state instead of going unavailable and back for a short outage; they
+        show the stale_since time instead.
+        """
+        now = monotonic()
+        if self._failing_since is None:
+            self._failing_since = now
+        remaining = self.grace_period - (now - self._failing_since)
+        if self.data is None or not self.last_update_success or remaining <= 0:
+            if self.breaker.state is BreakerState.CLOSED:
+                self.update_interval = timedelta(seconds=self.current_poll_interval)
+            # This will show entities as unavailable by raising UpdateFailed exception
+            raise UpdateFailed(message) from err
+
+        self._stale_retries += 1
+        if self.breaker.state is BreakerState.CLOSED:
+            # Retry soon, backing off towards the normal interval
+            delay = min(
+                self.current_poll_interval,
+                STALE_RETRY_MIN_DELAY * 2 ** (self._stale_retries - 1),
+            ) * random.uniform(0.8, 1.2)
+        else:
+            delay = self.update_interval.total_seconds()
+        # Refresh once more when the grace period ends, so the entities go unavailable then
+        self.update_interval = timedelta(seconds=min(delay, remaining))
+        _LOGGER.debug(
+            "%s, keeping the last states of %s for %.0fs", message, self.host, remaining
+        )
+        if self.data.stale_since is not None:
+            return self.data
+        return replace(self.data, changed=0, stale_since=time())
+
+    def _record_snapshot(self, snapshot: BoardSnapshot) -> None:
+        """Capture the input edges and relay runtimes of a freshly read snapshot."""
+        now = time()
+        self.relay_runtime.record(snapshot, now)
+        for channel in snapshot.table.inputs:
+            if (edges := self.input_edges.get(channel.device_unique_id)) is None:
+                edges = self.input_edges[channel.device_unique_id] = EdgeBuffer()
+            edges.record(snapshot.state(channel), now)
+
+    async def async_sample_inputs(self) -> None:
+        """Read the status page for input edges between refreshes. Runs until cancelled.
+
+        Only the small status page is read and the entities are only updated
+        when a channel changed, so this can run far faster than the refreshes.
+        """
+        # Start out of step with the samples of the other boards
+        await asyncio.sleep(self.hub.phase_offset(self.hub_key, self.input_sample_interval))
+        while True:
+            await asyncio.sleep(self.input_sample_interval)
+            if (
+                self.data is None
+                or not self.data.snapshot.table.inputs
+                or (self.push is not None and self.push.connected)
+                or self.breaker.state is not BreakerState.CLOSED
+            ):
+                continue
+            try:
+                # Bounded and spread by the hub like the refreshes of all boards
+                async with self.hub.poll_slot():
+                    status = await self.api.get_status()
+                self._apply_status(status.outputs, status.inputs)
+            except (APIAuthError, APIConnectionError) as err:
+                _LOGGER.debug("Sampling the inputs of %s failed: %s", self.host, err)
+            except Exception as err:  # pylint: disable=broad-except
+                # A malformed page must not end the sampling until the entry is reloaded
+                _LOGGER.warning("Sampling the inputs of %s failed: %r", self.host, err)
+
+    @callback
+    def _handle_push_status(self, status: StatusPacket) -> None:
+        """Apply a status packet pushed by the board."""
         try:
-            return [
-                device
-                for device in self.data.devices
-                if device.device_type == device_type and device.device_id == device_id and device.device_unique_id == device_unique_id
-            ][0]
-        except IndexError:
-            return None
+            self._apply_status(status.outputs, [status.input_state])
+        except ValueError as err:
+            _LOGGER.warning("Ignoring the status pushed by %s: %s", self.host, err)
+
+    @callback
+    def _apply_status(self, outputs: list[bool], inputs: list[bool]) -> None:
+        """Apply channel states read outside of a refresh."""
+        if self.data is None:
+            # Not set up yet, the first refresh reads the status itself
+            return
+        previous = self.data.snapshot
+        snapshot = BoardSnapshot(previous.table, previous.table.states(outputs, inputs))
+        self._record_snapshot(snapshot)
+        if not self.last_update_success:
+            changed = previous.table.all_mask
+        elif changed := snapshot.changed(previous):
+            self._last_activity = monotonic()
+        else:
+            return
+        # Not async_set_updated_data, which restarts the refresh timer: a board
+        # that changes more often than the refresh interval would never get
+        # its scheduled refresh, nor the topology and statistics it updates.
+        self.data = VellemanAPIData(
+            self.api.controller_name, snapshot, self.data.deviceInfo, changed
+        )
+        self.last_update_success = True
+        self.async_update_listeners()
+
+    @callback
+    def _handle_push_connection(self, connected: bool) -> None:
+        """Switch between push updates and polling."""
+        self.update_interval = timedelta(seconds=self.current_poll_interval)
+        if self.data is not None:
+            # The switches are only available while connected
+            self.async_update_listeners()
+        if connected:
+            _LOGGER.debug("Receiving push updates from %s", self.host)
+            return
+        _LOGGER.debug("Push updates from %s stopped, polling", self.host)
+        # Changes may have been missed while the connection was going down
+        self.hass.async_create_task(self.async_request_refresh())
+
+    def _next_interval(self) -> float:
+        """Return the delay until the next refresh.
+
+        The first one is shifted by the board's phase offset so boards that
+        were set up together do not keep polling in lockstep.
+        """
+        interval = self.current_poll_interval
+        if self._phase_pending:
+            self._phase_pending = False
+            interval += self.hub.phase_offset(self.hub_key, interval)
+        return interval
+
+    async def async_shutdown(self) -> None:
+        """Close the connections to the board."""
+        await super().async_shutdown()
+        self.hub.unregister(self.hub_key)
+        if self.push is not None:
+            self.push.on_connection = None
+            await self.push.close()
+        await self.api.disconnect()
+        await self.relay_runtime.async_save()
+
+    def get_device_by_unique_id(self, device_unique_id: str) -> Channel | None:
+        """Return device by unique id."""
+        # Called by the binary sensors and sensors to get their updated data from self.data
+        return self.data.snapshot.table.by_unique_id.get(device_unique_id)
+
+    def get_device_by_id(self, device_type: DeviceType, device_id: int) -> Channel | None:
+        """Return device by device type and id."""
+        return self.data.snapshot.table.by_id.get((device_type, device_id))
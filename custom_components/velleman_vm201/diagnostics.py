@@ -0,0 +1,62 @@
+"""Diagnostics support for the Velleman VM201 integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from . import MyConfigEntry
+
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: MyConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = config_entry.runtime_data.coordinator
+    data = coordinator.data
+
+    return {
+        "entry": {
+            "data": async_redact_data(config_entry.data, TO_REDACT),
+            "options": dict(config_entry.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None,
+            "topology_due": coordinator.topology_due,
+            "stale_since": data.stale_since if data else None,
+        },
+        "connection": coordinator.api.connection_stats,
+        "breaker": coordinator.breaker.as_dict(),
+        "push": coordinator.push.as_dict() if coordinator.push is not None else None,
+        "poll_stats": coordinator.stats.as_dict(),
+        "hub": coordinator.hub.stats,
+        "board": vars(data.deviceInfo) if data else None,
+        "devices": [
+            {
+                "device_id": device.device_id,
+                "device_unique_id": device.device_unique_id,
+                "device_type": device.device_type,
+                "name": device.name,
+                "state": data.state(device),
+            }
+            for device in data.devices
+        ]
+        if data
+        else [],
+        "states": f"{data.snapshot.states:#b}" if data else None,
+        "inputs": {
+            unique_id: edges.as_dict() for unique_id, edges in coordinator.input_edges.items()
+        },
+        "relays": {
+            unique_id: runtime.as_dict()
+            for unique_id, runtime in coordinator.relay_runtime.relays.items()
+        },
+    }
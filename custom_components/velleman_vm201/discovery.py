@@ -0,0 +1,91 @@
+"""Find VM201 boards on a network.
+
+The scan never sends credentials, as it probes every address of the
+network. A board without a password is recognised by its about page; one
+with a password only answers 401, so it is listed unverified and checked
+once the user picked it and entered the credentials.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+import ipaddress
+import logging
+from typing import NamedTuple
+
+from .api import APIAuthError, AsyncAPI, VMDeviceInfo
+from .const import (
+    DISCOVERY_CONCURRENCY,
+    DISCOVERY_CONNECT_TIMEOUT,
+    DISCOVERY_MAX_HOSTS,
+    DISCOVERY_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DiscoveredBoard(NamedTuple):
+    """A board that answered the scan."""
+
+    host: str
+    # None if the board asked for a login
+    info: VMDeviceInfo | None
+
+
+class NetworkTooLarge(ValueError):
+    """The network has more addresses than a scan may probe."""
+
+
+def scan_hosts(network: str, skip: Iterable[str] = ()) -> list[str]:
+    """Return the addresses of a network to probe, raise ValueError if it is invalid."""
+    hosts = ipaddress.ip_network(network.strip(), strict=False)
+    if hosts.num_addresses > DISCOVERY_MAX_HOSTS:
+        raise NetworkTooLarge(f"{network} has more than {DISCOVERY_MAX_HOSTS} addresses")
+    skip = set(skip)
+    # A single address or /31 has no network and broadcast address to leave out
+    addresses = hosts.hosts() if hosts.num_addresses > 2 else iter(hosts)
+    return [host for address in addresses if (host := str(address)) not in skip]
+
+
+def is_vm201(info: VMDeviceInfo) -> bool:
+    """Return True if the board info is that of a VM201."""
+    return info.model.strip().upper().startswith("VM201")
+
+
+async def async_probe(host: str) -> DiscoveredBoard | None:
+    """Return the board if the host serves the about page of a VM201 or asks for a login.
+
+    The request is sent without credentials.
+    """
+    api = AsyncAPI(
+        host,
+        timeout=DISCOVERY_TIMEOUT,
+        connect_timeout=DISCOVERY_CONNECT_TIMEOUT,
+        max_connections=1,
+    )
+    try:
+        info = await api.get_device_info()
+    except APIAuthError:
+        return DiscoveredBoard(host, None)
+    except Exception as err:  # pylint: disable=broad-except
+        # Closed ports, other web servers and unparsable pages all mean "no board"
+        _LOGGER.debug("No VM201 at %s: %r", host, err)
+        return None
+    finally:
+        await api.disconnect()
+    return DiscoveredBoard(host, info) if is_vm201(info) else None
+
+
+async def async_discover(
+    hosts: list[str], concurrency: int = DISCOVERY_CONCURRENCY
+) -> list[DiscoveredBoard]:
+    """Probe the hosts, at most concurrency at a time, and return the boards found."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(host: str) -> DiscoveredBoard | None:
+        async with semaphore:
+            return await async_probe(host)
+
+    results = await asyncio.gather(*(probe(host) for host in hosts))
+    return [board for board in results if board is not None]
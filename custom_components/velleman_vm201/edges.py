@@ -0,0 +1,78 @@
+"""Edge capture for the digital inputs of a VM201 board."""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator
+
+from .const import INPUT_EDGE_CAPACITY
+
+
+class EdgeBuffer:
+    """Bounded ring buffer of the transitions of one input.
+
+    Every change of the sampled state is stored with its timestamp; once the
+    buffer is full the oldest edges are overwritten. The counters keep
+    counting regardless.
+    """
+
+    __slots__ = ("_next", "_states", "_times", "edges", "last_change", "pulses", "size", "state")
+
+    def __init__(self, capacity: int = INPUT_EDGE_CAPACITY) -> None:
+        """Initialise."""
+        self._times = array("d", [0.0]) * capacity
+        self._states = array("b", [0]) * capacity
+        self._next = 0
+        self.size = 0
+        self.state: bool | None = None
+        # Transitions seen, and rising edges among them
+        self.edges = 0
+        self.pulses = 0
+        self.last_change: float | None = None
+
+    @property
+    def capacity(self) -> int:
+        """Return the number of edges the buffer holds."""
+        return len(self._times)
+
+    def record(self, state: bool, timestamp: float) -> bool:
+        """Add a sample, return True if it is an edge.
+
+        The first sample only sets the initial state.
+        """
+        if state == self.state:
+            return False
+        initial = self.state is None
+        self.state = state
+        if initial:
+            return False
+        self._times[self._next] = timestamp
+        self._states[self._next] = state
+        self._next = (self._next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.edges += 1
+        if state:
+            self.pulses += 1
+        self.last_change = timestamp
+        return True
+
+    def __len__(self) -> int:
+        """Return the number of buffered edges."""
+        return self.size
+
+    def __iter__(self) -> Iterator[tuple[float, bool]]:
+        """Iterate over the buffered edges, oldest first."""
+        start = (self._next - self.size) % self.capacity
+        for offset in range(self.size):
+            index = (start + offset) % self.capacity
+            yield self._times[index], bool(self._states[index])
+
+    def as_dict(self) -> dict:
+        """Return the counters and buffered edges, for diagnostics."""
+        return {
+            "state": self.state,
+            "edges": self.edges,
+            "pulses": self.pulses,
+            "last_change": self.last_change,
+            "buffered": list(self),
+        }
@@ -0,0 +1,98 @@
+"""Shared polling hub for all configured VM201 boards."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+import logging
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from .const import DATA_HUB, MAX_CONCURRENT_POLLS
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import VellemanCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fraction of the golden ratio, spreads any number of boards evenly over an interval
+_PHASE_STEP = 0.6180339887
+
+
+class VellemanHub:
+    """Spread the polls of all boards over time and limit their concurrency."""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_POLLS) -> None:
+        """Initialise."""
+        self.max_concurrent = max_concurrent
+        self.coordinators: dict[str, VellemanCoordinator] = {}
+        self._slots: dict[str, int] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+        self.polls: int = 0
+        self.failures: int = 0
+        self.total_poll_time: float = 0.0
+        self.max_poll_time: float = 0.0
+        self.total_wait_time: float = 0.0
+
+    def register(self, key: str, coordinator: VellemanCoordinator) -> None:
+        """Add a board to the hub."""
+        self.coordinators[key] = coordinator
+        used = set(self._slots.values())
+        self._slots[key] = next(slot for slot in range(len(used) + 1) if slot not in used)
+
+    def unregister(self, key: str) -> None:
+        """Remove a board from the hub."""
+        self.coordinators.pop(key, None)
+        self._slots.pop(key, None)
+
+    def phase_offset(self, key: str, interval: float) -> float:
+        """Return the delay that moves this board's polls out of step with the others."""
+        return (self._slots.get(key, 0) * _PHASE_STEP) % 1 * interval
+
+    @asynccontextmanager
+    async def poll_slot(self) -> AsyncIterator[None]:
+        """Wait for a free poll slot and record the poll duration."""
+        queued = monotonic()
+        async with self._semaphore:
+            started = monotonic()
+            self.total_wait_time += started - queued
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                yield
+            except BaseException:
+                self.failures += 1
+                raise
+            finally:
+                duration = monotonic() - started
+                self.in_flight -= 1
+                self.polls += 1
+                self.total_poll_time += duration
+                self.max_poll_time = max(self.max_poll_time, duration)
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """Return the aggregate poll statistics of all boards."""
+        return {
+            "boards": len(self.coordinators),
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "polls": self.polls,
+            "failures": self.failures,
+            "avg_poll_time": self.total_poll_time / self.polls if self.polls else 0.0,
+            "max_poll_time": self.max_poll_time,
+            "avg_wait_time": self.total_wait_time / self.polls if self.polls else 0.0,
+        }
+
+
+def get_hub(hass: HomeAssistant) -> VellemanHub:
+    """Return the hub shared by all config entries, creating it on first use."""
+    if (hub := hass.data.get(DATA_HUB)) is None:
+        hub = hass.data[DATA_HUB] = VellemanHub()
+    return hub
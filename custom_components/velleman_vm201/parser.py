@@ -0,0 +1,183 @@
+"""Parsers for the VM201 web pages.
+
+The pages served by the VM201 firmware are small and have a fixed layout, so
+they are parsed with precompiled regular expressions directly on the raw
+bytes. When a page does not look like the expected firmware markup the
+parsers fall back to BeautifulSoup, which is only imported at that point.
+"""
+
+from html import unescape
+import logging
+import re
+from typing import NamedTuple
+
+_LOGGER = logging.getLogger(__name__)
+
+_CONTENT_DIV = re.compile(rb"<div\s[^>]*\bid\s*=\s*[\"']?content\b[^>]*>(.*?)</div>", re.S)
+_FOOTER_DIV = re.compile(rb"<div\s[^>]*\bid\s*=\s*[\"']?footer\b[^>]*>(.*?)</div>", re.S)
+_PARAGRAPH = re.compile(rb"<p(\s[^>]*)?>(.*?)</p>", re.S)
+_INPUT = re.compile(rb"<input\b([^>]*)>")
+_ATTRIBUTE = re.compile(rb"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+_CLASS_ATTRIBUTE = re.compile(rb"\bclass\s*=")
+_TAG = re.compile(rb"<[^>]*>")
+_LEDS = re.compile(rb"<leds>(.*?)</leds>", re.S)
+_LED = re.compile(rb"<led>([^<]*)</led>")
+_INPUTS = re.compile(rb"<inputs>(.*?)</inputs>", re.S)
+_H1 = re.compile(rb"<h1(?:\s[^>]*)?>(.*?)</h1>", re.S)
+_H2 = re.compile(rb"<h2(?:\s[^>]*)?>(.*?)</h2>", re.S)
+_FIRST_P = re.compile(rb"<p(?:\s[^>]*)?>(.*?)</p>", re.S)
+_NESTED = re.compile(rb"<(?:div|p)[\s>]")
+
+
+class NamesEntry(NamedTuple):
+    """A channel listed on the names page."""
+
+    channel: str
+    device_type: str
+    name: str
+
+
+class StatusInfo(NamedTuple):
+    """The channel states listed on the status page."""
+
+    outputs: list[bool]
+    inputs: list[bool]
+
+
+class AboutInfo(NamedTuple):
+    """The board details listed on the about page."""
+
+    name: str
+    manufacturer: str
+    model: str
+    version: str
+
+
+class UnexpectedMarkup(ValueError):
+    """The page does not match the known firmware markup."""
+
+
+def _text(fragment: bytes) -> str:
+    """Return the text of a markup fragment, like BeautifulSoup's getText()."""
+    return unescape(_TAG.sub(b"", fragment).decode("utf-8", "replace"))
+
+
+def _attributes(attrs: bytes) -> dict[str, str]:
+    return {
+        match[1].decode().lower(): unescape(
+            (match[2] or match[3] or match[4] or b"").decode("utf-8", "replace")
+        )
+        for match in _ATTRIBUTE.finditer(attrs)
+    }
+
+
+def _fast_names(content: bytes) -> list[NamesEntry]:
+    match = _CONTENT_DIV.search(content)
+    if match is None or _NESTED.search(_PARAGRAPH.sub(b"", match[1])):
+        raise UnexpectedMarkup("names page without a flat content div")
+
+    entries = []
+    for paragraph in _PARAGRAPH.finditer(match[1]):
+        if paragraph[1] and _CLASS_ATTRIBUTE.search(paragraph[1]):
+            continue
+        body = paragraph[2]
+        field = _INPUT.search(body)
+        if field is None or _NESTED.search(body):
+            raise UnexpectedMarkup("channel paragraph without a name field")
+        attrs = _attributes(field[1])
+        text = _text(body)
+        device_type = text[0:text.find(" ")].lower()
+        entries.append(NamesEntry(attrs["name"][-2:-1], device_type, attrs["value"]))
+    if not entries:
+        raise UnexpectedMarkup("names page without channels")
+    return entries
+
+
+def _soup_names(content: bytes) -> list[NamesEntry]:
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
+    htmlContent = BeautifulSoup(content, "html.parser")
+    entries = []
+    for el in htmlContent.select("div#content p:not([class])"):
+        text = el.getText()
+        field = el.find("input")
+        entries.append(NamesEntry(field["name"][-2:-1], text[0:text.find(" ")].lower(), field["value"]))
+    return entries
+
+
+def parse_names(content: bytes) -> list[NamesEntry]:
+    """Return the channels listed on the names page."""
+    try:
+        return _fast_names(content)
+    except (UnexpectedMarkup, KeyError) as err:
+        _LOGGER.debug("Falling back to BeautifulSoup for names page: %s", err)
+        return _soup_names(content)
+
+
+def _fast_status(content: bytes) -> StatusInfo:
+    match = _LEDS.search(content)
+    if match is None:
+        raise UnexpectedMarkup("status page without leds")
+    # The firmware puts the input states in the text of <inputs>, around or
+    # after the <input> tags depending on the parser, so only the text counts.
+    inputs = _INPUTS.search(content)
+    return StatusInfo(
+        [bool(int(led)) for led in _LED.findall(match[1])],
+        [bool(int(state)) for state in _TAG.sub(b" ", inputs[1]).split()] if inputs else [],
+    )
+
+
+def _soup_status(content: bytes) -> StatusInfo:
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
+    htmlContent = BeautifulSoup(content, "html.parser")
+    inputs = htmlContent.find("inputs")
+    return StatusInfo(
+        [bool(int(led.getText())) for led in htmlContent.find("leds").find_all("led")],
+        [bool(int(state)) for state in inputs.getText().split()] if inputs else [],
+    )
+
+
+def parse_status(content: bytes) -> StatusInfo:
+    """Return the relay output and input states listed on the status page."""
+    try:
+        return _fast_status(content)
+    except (UnexpectedMarkup, ValueError) as err:
+        _LOGGER.debug("Falling back to BeautifulSoup for status page: %s", err)
+        return _soup_status(content)
+
+
+def _fast_about(content: bytes) -> AboutInfo:
+    h1 = _H1.search(content)
+    h2 = _H2.search(content)
+    first_p = _FIRST_P.search(content)
+    footer = _FOOTER_DIV.search(content)
+    if None in (h1, h2, first_p, footer) or _NESTED.search(footer[1]) or _NESTED.search(first_p[1]):
+        raise UnexpectedMarkup("about page without the expected headers")
+    return AboutInfo(
+        name=_text(h2[1]),
+        manufacturer=" ".join(_text(footer[1]).split(" ")[-2:]),
+        model=_text(h1[1]),
+        version=_text(first_p[1]).split(": ")[1],
+    )
+
+
+def _soup_about(content: bytes) -> AboutInfo:
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
+    htmlContent = BeautifulSoup(content, "html.parser")
+    return AboutInfo(
+        name=htmlContent.find("h2").getText(),
+        manufacturer=" ".join(htmlContent.find("div", {"id": "footer"}).getText().split(" ")[-2:]),
+        model=htmlContent.find("h1").getText(),
+        version=htmlContent.find("p").getText().split(": ")[1],
+    )
+
+
+def parse_about(content: bytes) -> AboutInfo:
+    """Return the board details listed on the about page."""
+    try:
+        return _fast_about(content)
+    except (UnexpectedMarkup, IndexError) as err:
+        _LOGGER.debug("Falling back to BeautifulSoup for about page: %s", err)
+        return _soup_about(content)
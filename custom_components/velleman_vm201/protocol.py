@@ -0,0 +1,288 @@
+"""Client for the VM201 TCP control protocol.
+
+Next to its web pages the VM201 listens on TCP port 9760 for a binary
+protocol. Every packet is framed as::
+
+    STX | length | command | data ... | checksum | ETX
+
+where length counts all bytes of the packet and the checksum is the two's
+complement of the sum of all bytes before it. After the login the board
+sends a status packet whenever a channel changes, so one idle connection
+replaces polling the status page.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+import random
+from typing import NamedTuple
+
+from .api import APIAuthError, APIConnectionError
+from .const import DEFAULT_CONNECT_TIMEOUT, DEFAULT_PROTOCOL_PORT
+from .stats import PollStats
+
+_LOGGER = logging.getLogger(__name__)
+
+STX = 0x0F
+ETX = 0xF0
+# STX, length, command, checksum and ETX
+PACKET_OVERHEAD = 5
+
+CMD_AUTHENTICATE = ord("A")
+CMD_USERNAME = ord("U")
+CMD_PASSWORD = ord("W")
+CMD_LOGGED_IN = ord("L")
+CMD_ACCESS_DENIED = ord("X")
+CMD_CLOSED = ord("C")
+CMD_STATUS_REQ = ord("R")
+CMD_STATUS = ord("S")
+CMD_ON = ord("O")
+CMD_OFF = ord("F")
+
+OUTPUTS = 8
+
+# Reconnect backoff (seconds) after the connection dropped
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+# A quiet connection is checked with a status request after this many
+# seconds, and taken as dead if the board does not answer within the timeout
+KEEPALIVE_INTERVAL = 30
+KEEPALIVE_TIMEOUT = 10
+
+
+class PacketError(ValueError):
+    """A packet with a bad length, checksum or end marker."""
+
+
+class StatusPacket(NamedTuple):
+    """The decoded data of a status packet."""
+
+    outputs: list[bool]
+    timers: list[bool]
+    input_state: bool
+
+
+def checksum(data: bytes) -> int:
+    """Return the checksum of the bytes preceding it in a packet."""
+    return -sum(data) & 0xFF
+
+
+def encode_packet(command: int, data: bytes = b"") -> bytes:
+    """Return a framed packet."""
+    head = bytes((STX, len(data) + PACKET_OVERHEAD, command)) + data
+    return head + bytes((checksum(head), ETX))
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    """Read the next packet, return its command and data."""
+    # Skip anything up to the start of a packet
+    while (await reader.readexactly(1))[0] != STX:
+        pass
+    length = (await reader.readexactly(1))[0]
+    if length < PACKET_OVERHEAD:
+        raise PacketError(f"Invalid packet length {length}")
+    packet = bytes((STX, length)) + await reader.readexactly(length - 2)
+    if packet[-1] != ETX:
+        raise PacketError("Missing end of packet")
+    if packet[-2] != checksum(packet[:-2]):
+        raise PacketError("Checksum mismatch")
+    return packet[2], packet[3:-2]
+
+
+def decode_status(data: bytes) -> StatusPacket:
+    """Decode the output, timer and input states of a status packet."""
+    if len(data) < 3:
+        raise PacketError(f"Status packet too short: {data!r}")
+    outputs, timers, input_state = data[:3]
+    return StatusPacket(
+        [bool(outputs & (1 << channel)) for channel in range(OUTPUTS)],
+        [bool(timers & (1 << channel)) for channel in range(OUTPUTS)],
+        bool(input_state & 1),
+    )
+
+
+class ProtocolClient:
+    """Persistent connection to the control protocol of one board.
+
+    run() keeps the connection open, logging in again after it dropped, and
+    hands every status packet to on_status. on_connection is told whenever
+    the connection comes up or goes down.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = DEFAULT_PROTOCOL_PORT,
+        user: str | None = None,
+        pwd: str | None = None,
+        on_status: Callable[[StatusPacket], None] | None = None,
+        on_connection: Callable[[bool], None] | None = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        stats: PollStats | None = None,
+    ) -> None:
+        """Initialise."""
+        # The host may include the port of the web server
+        self.host = host.partition(":")[0]
+        self.port = port
+        self.user = user
+        self.pwd = pwd
+        self.on_status = on_status
+        self.on_connection = on_connection
+        self.connect_timeout = connect_timeout
+        self.stats = stats or PollStats()
+        self.connects: int = 0
+        self.packets: int = 0
+        self.status_packets: int = 0
+        self.bad_packets: int = 0
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._logged_in = False
+
+    @property
+    def connected(self) -> bool:
+        """Return True if logged in on the board."""
+        return self._logged_in
+
+    async def connect(self) -> None:
+        """Open the connection and log in."""
+        try:
+            with self.stats.time("protocol connect"):
+                async with asyncio.timeout(self.connect_timeout):
+                    self._reader, self._writer = await asyncio.open_connection(
+                        self.host, self.port
+                    )
+                    await self._login()
+                    # Ask for the current states, later ones are pushed by the board
+                    await self._send(CMD_STATUS_REQ)
+        except (OSError, TimeoutError, asyncio.IncompleteReadError, PacketError) as err:
+            self._close()
+            raise APIConnectionError(
+                f"Error connecting to {self.host}:{self.port}: {err!r}"
+            ) from err
+        except APIAuthError:
+            self._close()
+            raise
+        self.connects += 1
+        self._logged_in = True
+        if self.on_connection is not None:
+            self.on_connection(True)
+
+    async def _login(self) -> None:
+        """Answer the authentication request of the board until logged in."""
+        while True:
+            command, _ = await read_packet(self._reader)
+            if command == CMD_AUTHENTICATE:
+                await self._send(CMD_USERNAME, (self.user or "").encode())
+                await self._send(CMD_PASSWORD, (self.pwd or "").encode())
+            elif command == CMD_LOGGED_IN:
+                return
+            elif command == CMD_ACCESS_DENIED:
+                raise APIAuthError("Error logging in. Invalid username or password.")
+            elif command == CMD_CLOSED:
+                raise ConnectionResetError("Connection closed by board")
+
+    async def listen(self) -> None:
+        """Dispatch packets until the connection drops.
+
+        A half-open connection would otherwise look connected forever, so the
+        board is asked for its status when it has been quiet for a while and
+        the connection is dropped if that goes unanswered.
+        """
+        probing = False
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(
+                        KEEPALIVE_TIMEOUT if probing else KEEPALIVE_INTERVAL
+                    ):
+                        command, data = await read_packet(self._reader)
+                except TimeoutError:
+                    if probing:
+                        _LOGGER.debug("No answer from %s:%s, reconnecting", self.host, self.port)
+                        return
+                    probing = True
+                    await self._send(CMD_STATUS_REQ)
+                    continue
+                except PacketError as err:
+                    # The next read resynchronises on the start of a packet
+                    self.bad_packets += 1
+                    _LOGGER.debug("Bad packet from %s: %s", self.host, err)
+                    continue
+                probing = False
+                self.packets += 1
+                if command == CMD_STATUS:
+                    self.status_packets += 1
+                    if self.on_status is not None:
+                        self.on_status(decode_status(data))
+                elif command == CMD_CLOSED:
+                    return
+        except (OSError, asyncio.IncompleteReadError, PacketError) as err:
+            _LOGGER.debug("Connection to %s:%s dropped: %s", self.host, self.port, err)
+        finally:
+            self._disconnected()
+
+    async def run(self) -> None:
+        """Stay connected, reconnecting with a growing delay. Runs until cancelled."""
+        delay = RECONNECT_MIN_DELAY
+        try:
+            while True:
+                try:
+                    await self.connect()
+                except APIAuthError as err:
+                    _LOGGER.error("Push updates from %s disabled: %s", self.host, err)
+                    return
+                except APIConnectionError as err:
+                    _LOGGER.debug("%s, retrying in %ss", err, delay)
+                else:
+                    delay = RECONNECT_MIN_DELAY
+                    await self.listen()
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+                delay = min(RECONNECT_MAX_DELAY, delay * 2)
+        finally:
+            self._disconnected()
+
+    async def set_outputs(self, on_mask: int, off_mask: int) -> None:
+        """Switch the masked relay outputs on and off."""
+        if not self._logged_in:
+            raise APIConnectionError(f"Not connected to {self.host}:{self.port}")
+        try:
+            if on_mask:
+                await self._send(CMD_ON, bytes((on_mask,)))
+            if off_mask:
+                await self._send(CMD_OFF, bytes((off_mask,)))
+        except OSError as err:
+            self._disconnected()
+            raise APIConnectionError(f"Error sending command to {self.host}: {err}") from err
+
+    async def _send(self, command: int, data: bytes = b"") -> None:
+        self._writer.write(encode_packet(command, data))
+        await self._writer.drain()
+
+    def _disconnected(self) -> None:
+        was_connected = self._logged_in
+        self._close()
+        if was_connected and self.on_connection is not None:
+            self.on_connection(False)
+
+    def _close(self) -> None:
+        self._logged_in = False
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def close(self) -> None:
+        """Close the connection."""
+        self._disconnected()
+
+    def as_dict(self) -> dict[str, int | bool]:
+        """Return the connection state and counters, for diagnostics."""
+        return {
+            "connected": self.connected,
+            "port": self.port,
+            "connects": self.connects,
+            "packets": self.packets,
+            "status_packets": self.status_packets,
+            "bad_packets": self.bad_packets,
+        }
@@ -0,0 +1,173 @@
+"""Runtime, switch count and duty cycle of the relay outputs."""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Any
+
+from .const import DOMAIN, RUNTIME_DUTY_WINDOW, RUNTIME_SAVE_DELAY
+from .snapshot import BoardSnapshot
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+STORAGE_VERSION = 1
+# The duty cycle window is kept in buckets of this many seconds
+BUCKET = 3600
+
+
+class RelayRuntime:
+    """Counters of one relay, updated from every snapshot.
+
+    A relay is taken to keep its state until a snapshot shows otherwise, so
+    the time between two snapshots counts as on time if the first showed it
+    on. The on time of the last RUNTIME_DUTY_WINDOW is kept in hourly
+    buckets for the duty cycle.
+    """
+
+    __slots__ = ("_bucket_starts", "_buckets", "last_sample", "on_time", "since", "state", "switches")
+
+    def __init__(self, since: float) -> None:
+        """Initialise."""
+        # Seconds on and off-to-on switches since the counters were started
+        self.on_time = 0.0
+        self.switches = 0
+        self.since = since
+        self.state: bool | None = None
+        self.last_sample: float | None = None
+        # One more than the window covers, for the partly expired oldest hour
+        buckets = RUNTIME_DUTY_WINDOW // BUCKET + 1
+        self._buckets = array("d", [0.0]) * buckets
+        self._bucket_starts = array("d", [0.0]) * buckets
+
+    def record(self, state: bool, timestamp: float) -> bool:
+        """Add a sample of the relay state.
+
+        The first sample after a start only sets the state, the time the
+        integration was not running is not counted. Return True if the
+        counters should be saved: the state changed or a new duty cycle
+        bucket was started.
+        """
+        save = state != self.state
+        if self.state and self.last_sample is not None and timestamp > self.last_sample:
+            self.on_time += timestamp - self.last_sample
+            self._add_to_buckets(self.last_sample, timestamp)
+            save |= self.last_sample // BUCKET != timestamp // BUCKET
+        if state and self.state is False:
+            self.switches += 1
+        self.state = state
+        self.last_sample = timestamp
+        return save
+
+    def _add_to_buckets(self, start: float, end: float) -> None:
+        """Spread an on period over the buckets of the hours it covers."""
+        while start < end:
+            bucket_start = start - start % BUCKET
+            index = int(bucket_start // BUCKET) % len(self._buckets)
+            if self._bucket_starts[index] != bucket_start:
+                # The bucket still holds an hour that left the window
+                self._bucket_starts[index] = bucket_start
+                self._buckets[index] = 0.0
+            part = min(end, bucket_start + BUCKET) - start
+            self._buckets[index] += part
+            start += part
+
+    def on_time_at(self, timestamp: float) -> float:
+        """Return the on time up to a moment after the last sample."""
+        if self.state and self.last_sample is not None and timestamp > self.last_sample:
+            return self.on_time + timestamp - self.last_sample
+        return self.on_time
+
+    def duty_cycle(self, timestamp: float) -> float:
+        """Return the percentage of the window (or the time since the start) the relay was on."""
+        window_start = max(self.since, timestamp - RUNTIME_DUTY_WINDOW)
+        if timestamp <= window_start:
+            return 0.0
+        on = sum(
+            seconds
+            for seconds, bucket_start in zip(self._buckets, self._bucket_starts, strict=True)
+            if bucket_start + BUCKET > window_start
+        )
+        # Buckets are whole hours; only the part of the oldest one inside the window counts
+        oldest = window_start - window_start % BUCKET
+        index = int(oldest // BUCKET) % len(self._buckets)
+        if self._bucket_starts[index] == oldest:
+            on -= self._buckets[index] * (window_start - oldest) / BUCKET
+        on += self.on_time_at(timestamp) - self.on_time
+        return max(0.0, min(100.0, on / (timestamp - window_start) * 100))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters, as stored and for diagnostics."""
+        return {
+            "on_time": self.on_time,
+            "switches": self.switches,
+            "since": self.since,
+            "buckets": [
+                [start, seconds]
+                for start, seconds in zip(self._bucket_starts, self._buckets, strict=True)
+                if seconds
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> RelayRuntime:
+        """Return the counters stored with as_dict."""
+        runtime = cls(data["since"])
+        runtime.on_time = data["on_time"]
+        runtime.switches = data["switches"]
+        for start, seconds in data.get("buckets", ()):
+            index = int(start // BUCKET) % len(runtime._buckets)
+            runtime._bucket_starts[index] = start
+            runtime._buckets[index] = seconds
+        return runtime
+
+
+class RelayRuntimeTracker:
+    """The relay counters of a config entry, persisted across restarts."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialise."""
+        # Imported here so RelayRuntime can be used without Home Assistant
+        from homeassistant.helpers.storage import Store  # pylint: disable=import-outside-toplevel
+
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.runtime"
+        )
+        # Counters by unique id of the output channel
+        self.relays: dict[str, RelayRuntime] = {}
+        # Set while a delayed save is scheduled, cleared when it writes
+        self._save_pending = False
+
+    async def async_load(self) -> None:
+        """Load the stored counters."""
+        if (data := await self._store.async_load()) is None:
+            return
+        self.relays = {
+            unique_id: RelayRuntime.from_dict(counters)
+            for unique_id, counters in data["relays"].items()
+        }
+
+    def record(self, snapshot: BoardSnapshot, timestamp: float) -> None:
+        """Update the counters of all outputs from a snapshot."""
+        save = False
+        for channel in snapshot.table.outputs:
+            if (runtime := self.relays.get(channel.device_unique_id)) is None:
+                runtime = self.relays[channel.device_unique_id] = RelayRuntime(timestamp)
+            save |= runtime.record(snapshot.state(channel), timestamp)
+        if save and not self._save_pending:
+            # Every call would move the delayed write further out, so it is
+            # only scheduled once; it saves the counters as they are by then.
+            self._save_pending = True
+            self._store.async_delay_save(self._data, RUNTIME_SAVE_DELAY)
+
+    def _data(self) -> dict[str, Any]:
+        self._save_pending = False
+        return {"relays": {unique_id: runtime.as_dict() for unique_id, runtime in self.relays.items()}}
+
+    async def async_save(self) -> None:
+        """Save the counters now, replacing a pending delayed save."""
+        await self._store.async_save(self._data())
+
+    async def async_remove(self) -> None:
+        """Remove the stored counters."""
+        await self._store.async_remove()
@@ -1,26 +1,166 @@
 """Interfaces with the Integration 101 Template api sensors."""
 
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 import logging
+from time import time
+from typing import Any
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
+    SensorEntityDescription,
     SensorStateClass,
 )
-from homeassistant.const import UnitOfTemperature
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTime,
+)
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.typing import StateType
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
 from . import MyConfigEntry
-from .api import Device, VMDeviceInfo, DeviceType
-from .const import DOMAIN
+from .api import VMDeviceInfo, DeviceType
+from .const import DOMAIN, RUNTIME_UPDATE_INTERVAL
 from .coordinator import VellemanCoordinator
+from .edges import EdgeBuffer
+from .runtime import RelayRuntime
+from .snapshot import Channel
+from .stats import PollStats
 
 _LOGGER = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, kw_only=True)
+class VellemanDiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Describes a poll statistics sensor."""
+
+    value_fn: Callable[[PollStats], float | int | datetime | None]
+    attributes_fn: Callable[[PollStats], dict[str, Any]] | None = None
+
+
+DIAGNOSTIC_SENSORS: tuple[VellemanDiagnosticSensorEntityDescription, ...] = (
+    VellemanDiagnosticSensorEntityDescription(
+        key="poll_time",
+        name="Poll time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda stats: stats.last_poll * 1000,
+        attributes_fn=lambda stats: {
+            "average_ms": round(stats.average_poll * 1000, 1),
+            "histogram": stats.histogram,
+        },
+    ),
+    VellemanDiagnosticSensorEntityDescription(
+        key="last_update",
+        name="Last update",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda stats: dt_util.utc_from_timestamp(stats.last_success)
+        if stats.last_success is not None
+        else None,
+        attributes_fn=lambda stats: {
+            "stale": stats.consecutive_failures > 0,
+            "consecutive_failures": stats.consecutive_failures,
+        },
+    ),
+    VellemanDiagnosticSensorEntityDescription(
+        key="polls",
+        name="Polls",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.polls,
+    ),
+    VellemanDiagnosticSensorEntityDescription(
+        key="bytes_received",
+        name="Bytes received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.bytes_received,
+    ),
+    VellemanDiagnosticSensorEntityDescription(
+        key="request_errors",
+        name="Request errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.errors,
+    ),
+    VellemanDiagnosticSensorEntityDescription(
+        key="request_timeouts",
+        name="Request timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.timeouts,
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class VellemanInputSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor derived from the edges of an input."""
+
+    value_fn: Callable[[EdgeBuffer], StateType | datetime]
+
+
+INPUT_SENSORS: tuple[VellemanInputSensorEntityDescription, ...] = (
+    VellemanInputSensorEntityDescription(
+        key="pulses",
+        name="pulses",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda edges: edges.pulses,
+    ),
+    VellemanInputSensorEntityDescription(
+        key="last_change",
+        name="last change",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda edges: dt_util.utc_from_timestamp(edges.last_change)
+        if edges.last_change is not None
+        else None,
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class VellemanRelaySensorEntityDescription(SensorEntityDescription):
+    """Describes a statistic of a relay output."""
+
+    value_fn: Callable[[RelayRuntime, float], StateType]
+
+
+RELAY_SENSORS: tuple[VellemanRelaySensorEntityDescription, ...] = (
+    VellemanRelaySensorEntityDescription(
+        key="on_time",
+        name="on time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        suggested_display_precision=2,
+        value_fn=lambda runtime, now: round(runtime.on_time_at(now) / 3600, 4),
+    ),
+    VellemanRelaySensorEntityDescription(
+        key="switch_count",
+        name="switch count",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda runtime, now: runtime.switches,
+    ),
+    VellemanRelaySensorEntityDescription(
+        key="duty_cycle",
+        name="duty cycle",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda runtime, now: round(runtime.duty_cycle(now), 2),
+    ),
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: MyConfigEntry,
@@ -33,95 +173,196 @@ async def async_setup_entry(
     
     # Enumerate all the sensors in your data value from your DataUpdateCoordinator and add an instance of your sensor class
     # to a list for each one.
-    # This maybe different in your specific case, depending on how your data is structured
-    sensors = [
-        VellemanSensor(coordinator, device)
+    # The board has no analog channels, its sensors are statistics of the
+    # digital channels and of the polling.
+    sensors: list[SensorEntity] = [
+        VellemanInputSensor(coordinator, device, description, deviceInfo)
         for device in coordinator.data.devices
-        if device.device_type == DeviceType.TEMP_SENSOR
+        if device.device_type == DeviceType.INPUT_SENSOR
+        for description in INPUT_SENSORS
     ]
+    sensors.extend(
+        VellemanRelaySensor(coordinator, device, description, deviceInfo)
+        for device in coordinator.data.devices
+        if device.device_type == DeviceType.OUTPUT_SENSOR
+        for description in RELAY_SENSORS
+    )
+    sensors.extend(
+        VellemanDiagnosticSensor(coordinator, description, deviceInfo)
+        for description in DIAGNOSTIC_SENSORS
+    )
 
     # Create the sensors.
     async_add_entities(sensors)
 
 
-class VellemanSensor(CoordinatorEntity, SensorEntity):
-    """Implementation of a sensor."""
+class VellemanInputSensor(CoordinatorEntity, SensorEntity):
+    """Pulse count or last change of an input."""
+
+    entity_description: VellemanInputSensorEntityDescription
 
-    def __init__(self, coordinator: VellemanCoordinator, device: Device) -> None:
+    def __init__(
+        self,
+        coordinator: VellemanCoordinator,
+        device: Channel,
+        description: VellemanInputSensorEntityDescription,
+        deviceInfo: VMDeviceInfo,
+    ) -> None:
         """Initialise sensor."""
         super().__init__(coordinator)
         self.device = device
-        self.device_id = device.device_id
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}-{device.device_unique_id}-{description.key}"
+        self._attr_device_info = DeviceInfo(
+            name=deviceInfo.name,
+            manufacturer=deviceInfo.manufacturer,
+            model=deviceInfo.model,
+            sw_version=deviceInfo.version,
+            identifiers={(DOMAIN, coordinator.board_id)},
+        )
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Update sensor with latest data from coordinator."""
-        # This method is called by your DataUpdateCoordinator when a successful update runs.
-        self.device = self.coordinator.get_device_by_id(
-            self.device.device_type, self.device_id
+        self.device = self.coordinator.get_device_by_unique_id(
+            self.device.device_unique_id
         )
-        _LOGGER.debug("Device: %s", self.device)
+        # The edges only change together with the state of the input
+        if (
+            self.coordinator.last_update_success
+            and not self.coordinator.data.changed & self.device.mask
+        ):
+            return
         self.async_write_ha_state()
 
     @property
-    def device_class(self) -> str:
-        """Return device class."""
-        # https://developers.home-assistant.io/docs/core/entity/sensor/#available-device-classes
-        return SensorDeviceClass.TEMPERATURE
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return f"{self.device.name} {self.entity_description.name}"
 
     @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information."""
-        # Identifiers are what group entities into the same device.
-        # If your device is created elsewhere, you can just specify the indentifiers parameter.
-        # If your device connects via another device, add via_device parameter with the indentifiers of that device.
-        return DeviceInfo(
-            name=f"ExampleDevice{self.device.device_id}",
-            manufacturer="ACME Manufacturer",
-            model="Door&Temp v1",
-            sw_version="1.0",
-            identifiers={
-                (
-                    DOMAIN,
-                    f"{self.coordinator.data.controller_name}-{self.device.device_id}",
+    def native_value(self) -> StateType | datetime:
+        """Return the pulse count or last change."""
+        if (edges := self.coordinator.input_edges.get(self.device.device_unique_id)) is None:
+            return None
+        return self.entity_description.value_fn(edges)
+
+
+class VellemanRelaySensor(CoordinatorEntity, SensorEntity):
+    """On time, switch count or duty cycle of a relay output."""
+
+    entity_description: VellemanRelaySensorEntityDescription
+    # Value of the last state write
+    _written: StateType = None
+
+    def __init__(
+        self,
+        coordinator: VellemanCoordinator,
+        device: Channel,
+        description: VellemanRelaySensorEntityDescription,
+        deviceInfo: VMDeviceInfo,
+    ) -> None:
+        """Initialise sensor."""
+        super().__init__(coordinator)
+        self.device = device
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}-{device.device_unique_id}-{description.key}"
+        self._attr_device_info = DeviceInfo(
+            name=deviceInfo.name,
+            manufacturer=deviceInfo.manufacturer,
+            model=deviceInfo.model,
+            sw_version=deviceInfo.version,
+            identifiers={(DOMAIN, coordinator.board_id)},
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Also update while the relay is on, as its on time keeps growing."""
+        await super().async_added_to_hass()
+        if self.entity_description.key != "switch_count":
+            self.async_on_remove(
+                async_track_time_interval(
+                    self.hass, self._async_tick, timedelta(seconds=RUNTIME_UPDATE_INTERVAL)
                 )
-            },
+            )
+
+    @callback
+    def _async_tick(self, now: datetime) -> None:
+        """Write the state if the value moved since the last write."""
+        if self.available and self.native_value != self._written:
+            self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update sensor with latest data from coordinator."""
+        self.device = self.coordinator.get_device_by_unique_id(
+            self.device.device_unique_id
         )
+        # The counters only change with the state of the relay
+        if (
+            self.coordinator.last_update_success
+            and not self.coordinator.data.changed & self.device.mask
+        ):
+            return
+        self.async_write_ha_state()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Remember the written value for the interval updates."""
+        self._written = self.native_value
+        super().async_write_ha_state()
 
     @property
     def name(self) -> str:
         """Return the name of the sensor."""
-        return self.device.name
+        return f"{self.device.name} {self.entity_description.name}"
 
     @property
-    def native_value(self) -> int | float:
-        """Return the state of the entity."""
-        # Using native value and native unit of measurement, allows you to change units
-        # in Lovelace and HA will automatically calculate the correct value.
-        return float(self.device.state)
+    def native_value(self) -> StateType:
+        """Return the statistic."""
+        if (runtime := self.coordinator.relay_runtime.relays.get(self.device.device_unique_id)) is None:
+            return None
+        return self.entity_description.value_fn(runtime, time())
 
-    @property
-    def native_unit_of_measurement(self) -> str | None:
-        """Return unit of temperature."""
-        return UnitOfTemperature.CELSIUS
+
+class VellemanDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """Poll statistics of a board, disabled by default."""
+
+    entity_description: VellemanDiagnosticSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator: VellemanCoordinator,
+        description: VellemanDiagnosticSensorEntityDescription,
+        deviceInfo: VMDeviceInfo,
+    ) -> None:
+        """Initialise sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}-{coordinator.hub_key}-{description.key}"
+        # Attach to the same device as the channel entities of this board
+        self._attr_device_info = DeviceInfo(
+            name=deviceInfo.name,
+            manufacturer=deviceInfo.manufacturer,
+            model=deviceInfo.model,
+            sw_version=deviceInfo.version,
+            identifiers={(DOMAIN, coordinator.board_id)},
+        )
 
     @property
-    def state_class(self) -> str | None:
-        """Return state class."""
-        # https://developers.home-assistant.io/docs/core/entity/sensor/#available-state-classes
-        return SensorStateClass.MEASUREMENT
+    def available(self) -> bool:
+        """Return True, the statistics are also meaningful when polling fails."""
+        return True
 
     @property
-    def unique_id(self) -> str:
-        """Return unique id."""
-        # All entities must have a unique id.  Think carefully what you want this to be as
-        # changing it later will cause HA to create new entities.
-        return f"{DOMAIN}-{self.device.device_unique_id}"
+    def native_value(self) -> float | int | datetime | None:
+        """Return the statistic."""
+        return self.entity_description.value_fn(self.coordinator.stats)
 
     @property
-    def extra_state_attributes(self):
+    def extra_state_attributes(self) -> dict[str, Any] | None:
         """Return the extra state attributes."""
-        # Add any additional attributes you want on your sensor.
-        attrs = {}
-        attrs["extra_info"] = "Extra Info"
-        return attrs
+        if self.entity_description.attributes_fn is None:
+            return None
+        return self.entity_description.attributes_fn(self.coordinator.stats)
@@ -0,0 +1,102 @@
+"""Compact, immutable state snapshots of a VM201 board."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .api import Device, DeviceType
+
+
+class Channel:
+    """Static metadata of one board channel, shared by all snapshots of a topology."""
+
+    __slots__ = ("device_id", "device_type", "device_unique_id", "index", "mask", "name")
+
+    def __init__(self, device: Device, position: int) -> None:
+        """Initialise."""
+        self.device_id = device.device_id
+        self.device_unique_id = device.device_unique_id
+        self.device_type = device.device_type
+        self.name = device.name
+        # Channel number on the board, as used by the status page and command CGI
+        self.index = int(device.device_unique_id[-1:])
+        # Bit of this channel in the snapshot state masks
+        self.mask = 1 << position
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"Channel({self.device_unique_id!r}, {self.device_type!r}, {self.name!r})"
+
+
+class ChannelTable:
+    """The channels of a board with their lookup tables, built once per topology."""
+
+    __slots__ = (
+        "all_mask",
+        "by_id",
+        "by_unique_id",
+        "channels",
+        "input_count",
+        "inputs",
+        "output_count",
+        "outputs",
+    )
+
+    def __init__(self, devices: list[Device]) -> None:
+        """Initialise."""
+        self.channels = tuple(Channel(device, position) for position, device in enumerate(devices))
+        self.all_mask = (1 << len(self.channels)) - 1
+        self.by_unique_id = {channel.device_unique_id: channel for channel in self.channels}
+        self.by_id = {(channel.device_type, channel.device_id): channel for channel in self.channels}
+        self.outputs = tuple(
+            channel for channel in self.channels if channel.device_type == DeviceType.OUTPUT_SENSOR
+        )
+        self.inputs = tuple(
+            channel for channel in self.channels if channel.device_type == DeviceType.INPUT_SENSOR
+        )
+        # Entries a status needs to cover every channel
+        self.output_count = max((channel.index + 1 for channel in self.outputs), default=0)
+        self.input_count = max((channel.index + 1 for channel in self.inputs), default=0)
+
+    def states(self, outputs: list[bool], inputs: list[bool]) -> int:
+        """Return the state mask for the relay output and input states.
+
+        Raise ValueError if a channel of the table has no state in them.
+        """
+        if len(outputs) < self.output_count or len(inputs) < self.input_count:
+            raise ValueError(
+                f"Status has {len(outputs)} outputs and {len(inputs)} inputs, "
+                f"the names page {self.output_count} and {self.input_count}"
+            )
+        states = 0
+        for channel in self.outputs:
+            if outputs[channel.index]:
+                states |= channel.mask
+        for channel in self.inputs:
+            if inputs[channel.index]:
+                states |= channel.mask
+        return states
+
+    def same_channels(self, other: ChannelTable | None) -> bool:
+        """Return True if both tables describe the same channels, ids and names."""
+        return other is not None and [
+            (channel.device_unique_id, channel.device_id, channel.name) for channel in self.channels
+        ] == [(channel.device_unique_id, channel.device_id, channel.name) for channel in other.channels]
+
+
+@dataclass(frozen=True, slots=True)
+class BoardSnapshot:
+    """The channel states of a board at one point in time, packed into a bitmask."""
+
+    table: ChannelTable
+    states: int = 0
+
+    def state(self, channel: Channel) -> bool:
+        """Return the state of a channel."""
+        return bool(self.states & channel.mask)
+
+    def changed(self, previous: BoardSnapshot | None) -> int:
+        """Return the mask of the channels that differ from the previous snapshot."""
+        if previous is None or previous.table is not self.table:
+            return self.table.all_mask
+        return self.states ^ previous.states
@@ -0,0 +1,131 @@
+"""Poll path instrumentation for a single VM201 board."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from time import perf_counter, time
+
+# Upper bounds (ms) of the poll latency histogram buckets, the last one is open ended
+LATENCY_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+LATENCY_WINDOW = 500
+
+
+@dataclass
+class PhaseStats:
+    """Timing of one phase of the poll path, e.g. a request or a parse step."""
+
+    count: int = 0
+    last: float = 0.0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, duration: float) -> None:
+        """Record one measurement."""
+        self.count += 1
+        self.last = duration
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the timings in milliseconds."""
+        return {
+            "count": self.count,
+            "last_ms": self.last * 1000,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+        }
+
+
+class PollStats:
+    """Timings, byte counts and error counters of one board."""
+
+    def __init__(self) -> None:
+        """Initialise."""
+        self.phases: dict[str, PhaseStats] = {}
+        self.requests: int = 0
+        self.bytes_received: int = 0
+        self.errors: int = 0
+        self.timeouts: int = 0
+        # Responses identical to the previous one, which were not parsed again
+        self.unchanged: int = 0
+        self.polls: int = 0
+        self.failed_polls: int = 0
+        self.last_poll: float = 0.0
+        # Wall clock time of the last successful poll, and failed polls since
+        self.last_success: float | None = None
+        self.consecutive_failures: int = 0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def add(self, phase: str, duration: float) -> None:
+        """Record the duration of a phase."""
+        if (stats := self.phases.get(phase)) is None:
+            stats = self.phases[phase] = PhaseStats()
+        stats.add(duration)
+
+    @contextmanager
+    def time(self, phase: str) -> Iterator[None]:
+        """Time the enclosed block as the given phase."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, perf_counter() - start)
+
+    def add_response(self, size: int) -> None:
+        """Record a received response body."""
+        self.requests += 1
+        self.bytes_received += size
+
+    def add_error(self, timeout: bool = False) -> None:
+        """Record a failed request."""
+        self.errors += 1
+        if timeout:
+            self.timeouts += 1
+
+    def add_poll(self, duration: float, success: bool) -> None:
+        """Record a complete coordinator refresh."""
+        self.polls += 1
+        if success:
+            self.last_success = time()
+            self.consecutive_failures = 0
+        else:
+            self.failed_polls += 1
+            self.consecutive_failures += 1
+        self.last_poll = duration
+        self._latencies.append(duration)
+
+    @property
+    def histogram(self) -> dict[str, int]:
+        """Return the poll latency histogram of the last LATENCY_WINDOW polls."""
+        counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        for latency in self._latencies:
+            counts[bisect_left(LATENCY_BUCKETS, latency * 1000)] += 1
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}ms"]
+        return dict(zip(labels, counts, strict=True))
+
+    @property
+    def average_poll(self) -> float:
+        """Return the average poll duration (s) of the last LATENCY_WINDOW polls."""
+        return sum(self._latencies) / len(self._latencies) if self._latencies else 0.0
+
+    def as_dict(self) -> dict:
+        """Return all statistics, for diagnostics."""
+        return {
+            "polls": self.polls,
+            "failed_polls": self.failed_polls,
+            "consecutive_failures": self.consecutive_failures,
+            "last_success": self.last_success,
+            "last_poll_ms": self.last_poll * 1000,
+            "average_poll_ms": self.average_poll * 1000,
+            "requests": self.requests,
+            "bytes_received": self.bytes_received,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "unchanged_responses": self.unchanged,
+            "latency_histogram": self.histogram,
+            "phases": {phase: stats.as_dict() for phase, stats in self.phases.items()},
+        }
@@ -0,0 +1,138 @@
+"""Interfaces with the Velleman VM201 relay outputs."""
+
+import logging
+from typing import Any
+
+from homeassistant.components.switch import SwitchDeviceClass, SwitchEntity
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import MyConfigEntry
+from .api import DeviceType, VMDeviceInfo
+from .const import DOMAIN
+from .coordinator import VellemanCoordinator
+from .snapshot import Channel
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: MyConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+):
+    """Set up the Switches."""
+    coordinator: VellemanCoordinator = config_entry.runtime_data.coordinator
+    # The relays are switched over the control protocol of the push updates
+    if coordinator.push is None:
+        return
+    deviceInfo: VMDeviceInfo = coordinator.data.deviceInfo
+
+    # Every relay output can be switched, its state is read back by the output sensor.
+    switches = [
+        VellemanRelaySwitch(coordinator, device, deviceInfo)
+        for device in coordinator.data.devices
+        if device.device_type == DeviceType.OUTPUT_SENSOR
+    ]
+
+    async_add_entities(switches)
+
+
+class VellemanRelaySwitch(CoordinatorEntity, SwitchEntity):
+    """Implementation of a relay switch.
+
+    Commands go over the TCP control protocol, so the switch is unavailable
+    while that connection is down. Within the grace period of a board that
+    cannot be read, the stale_since attribute tells since when the state is
+    the last known one.
+    """
+
+    _attr_device_class = SwitchDeviceClass.SWITCH
+
+    def __init__(self, coordinator: VellemanCoordinator, device: Channel, deviceInfo: VMDeviceInfo) -> None:
+        """Initialise switch."""
+        super().__init__(coordinator)
+        self.device = device
+        self.coordinator = coordinator
+        self.channel = device.index
+        # State assumed after a command until a status read confirms it
+        self._optimistic: bool | None = None
+        self._pending_commands = 0
+        self._connected = coordinator.push.connected
+        self._attr_extra_state_attributes = {"stale_since": coordinator.stale_since}
+
+        self._attr_unique_id = f"{DOMAIN}-{device.device_unique_id}-switch"
+        self._attr_device_info = DeviceInfo(
+            name=deviceInfo.name,
+            manufacturer=deviceInfo.manufacturer,
+            model=deviceInfo.model,
+            sw_version=deviceInfo.version,
+            identifiers={(DOMAIN, coordinator.board_id)},
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update switch with latest data from coordinator."""
+        self.device = self.coordinator.get_device_by_unique_id(
+            self.device.device_unique_id
+        )
+        # Keep the optimistic state while a command is on its way to the board.
+        if self._pending_commands:
+            return
+        confirmed = self._optimistic is not None
+        self._optimistic = None
+        reconnected = self._connected != self.coordinator.push.connected
+        self._connected = self.coordinator.push.connected
+        stale_changed = self._attr_extra_state_attributes["stale_since"] != (
+            self.coordinator.stale_since
+        )
+        self._attr_extra_state_attributes = {"stale_since": self.coordinator.stale_since}
+        if (
+            confirmed
+            or reconnected
+            or stale_changed
+            or not self.coordinator.last_update_success
+            or self.coordinator.data.changed & self.device.mask
+        ):
+            self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Return True if the relay can be switched."""
+        return super().available and self.coordinator.push.connected
+
+    @property
+    def name(self) -> str:
+        """Return the name of the switch."""
+        return self.device.name
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return if the relay is on."""
+        if self._optimistic is not None:
+            return self._optimistic
+        return self.coordinator.data.state(self.device)
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Switch the relay on."""
+        await self._async_switch(True)
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """Switch the relay off."""
+        await self._async_switch(False)
+
+    async def _async_switch(self, state: bool) -> None:
+        self._optimistic = state
+        self._pending_commands += 1
+        self.async_write_ha_state()
+        try:
+            await self.coordinator.async_set_output(self.channel, state)
+        except Exception as err:
+            self._optimistic = None
+            self.async_write_ha_state()
+            raise HomeAssistantError(f"Error switching {self.name}: {err}") from err
+        finally:
+            self._pending_commands -= 1
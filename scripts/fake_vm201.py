@@ -0,0 +1,374 @@
+"""Fake VM201 web server for development, benchmarks and load tests.
+
+Serves ``/``, ``/names.html``, ``/cgi/status.cgi`` and ``/about.html`` with
+the markup of the VM201 firmware. Basic auth, response
+latency and jitter, dropped connections and random channel changes can be
+configured to reproduce real boards on slow or flaky links.
+
+With a protocol port the TCP control protocol is emulated as well: clients
+log in, switch relays and get a status packet pushed on every change.
+
+Run standalone with ``python scripts/fake_vm201.py --port 8080``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from base64 import b64encode
+import random
+import threading
+from urllib.parse import urlsplit
+
+OUTPUTS = 8
+
+# Framing and commands of the TCP control protocol
+STX = 0x0F
+ETX = 0xF0
+CMD_AUTHENTICATE = ord("A")
+CMD_USERNAME = ord("U")
+CMD_PASSWORD = ord("W")
+CMD_LOGGED_IN = ord("L")
+CMD_ACCESS_DENIED = ord("X")
+CMD_STATUS_REQ = ord("R")
+CMD_STATUS = ord("S")
+CMD_ON = ord("O")
+CMD_OFF = ord("F")
+
+NAMES_HTML = """<!DOCTYPE html>
+<html>
+<head><title>VM201 - Names</title><link rel="stylesheet" href="style.css"/></head>
+<body>
+<div id="header"><h1>VM201</h1></div>
+<div id="content">
+<form action="names.html" method="post">
+<p class="info">Change the names of the channels below.</p>
+{channels}
+<p class="submit"><input type="submit" value="Save"/></p>
+</form>
+</div>
+<div id="footer">Copyright Velleman Components</div>
+</body>
+</html>
+"""
+OUTPUT_NAME = '<p>Output {number} <input type="text" name="o{channel}n" maxlength="15" value="{name}"/></p>\n'
+INPUT_NAME = '<p>Input 1 <input type="text" name="i0n" maxlength="15" value="{name}"/></p>'
+
+ABOUT_HTML = """<!DOCTYPE html>
+<html>
+<head><title>VM201 - About</title><link rel="stylesheet" href="style.css"/></head>
+<body>
+<div id="content">
+<h1>VM201</h1>
+<h2>{name}</h2>
+<p>Firmware version: {version}</p>
+<p>MAC address: {mac}</p>
+</div>
+<div id="footer">Copyright Velleman Components</div>
+</body>
+</html>
+"""
+
+INDEX_HTML = """<!DOCTYPE html>
+<html><head><title>VM201</title></head><body><div id="content"><h1>VM201</h1></div></body></html>
+"""
+
+
+def packet(command: int, data: bytes = b"") -> bytes:
+    """Return a framed control protocol packet."""
+    head = bytes((STX, len(data) + 5, command)) + data
+    return head + bytes((-sum(head) & 0xFF, ETX))
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    """Read a control protocol packet, return its command and data."""
+    while (await reader.readexactly(1))[0] != STX:
+        pass
+    length = (await reader.readexactly(1))[0]
+    rest = await reader.readexactly(length - 2)
+    if rest[-1] != ETX or (STX + length + sum(rest[:-1])) & 0xFF:
+        raise ValueError("Corrupt packet")
+    return rest[0], rest[1:-2]
+
+
+class FakeVM201:
+    """In-process fake of a single VM201 board."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        user: str | None = None,
+        pwd: str | None = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        change_rate: float = 0.0,
+        keep_alive: bool = True,
+        name: str = "Ethernet relay card",
+        version: str = "1.0.3",
+        seed: int | None = None,
+        protocol_port: int | None = None,
+    ) -> None:
+        """Initialise.
+
+        latency/jitter: seconds added to every response (jitter is uniform).
+        drop_rate: probability that a request is answered by closing the socket.
+        change_rate: probability that a channel flips before a status request.
+        protocol_port: port of the TCP control protocol, None to disable it.
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.change_rate = change_rate
+        self.keep_alive = keep_alive
+        self.name = name
+        self.version = version
+        self.outputs = [False] * OUTPUTS
+        self.input = False
+        self.output_names = [f"Relay {channel + 1}" for channel in range(OUTPUTS)]
+        self.input_name = "Input"
+        self.requests: dict[str, int] = {}
+        self.connections = 0
+        self._auth = (
+            "Basic " + b64encode(f"{user}:{pwd}".encode()).decode("ascii")
+            if user is not None and pwd is not None
+            else None
+        )
+        self._credentials = (user, pwd) if user is not None and pwd is not None else None
+        self._random = random.Random(seed)
+        self._server: asyncio.Server | None = None
+        self._clients: set[asyncio.Task] = set()
+        self.protocol_port = protocol_port
+        self._protocol_server: asyncio.Server | None = None
+        # Logged in control protocol clients, which get the status pushed
+        self._subscribers: set[asyncio.StreamWriter] = set()
+
+    @property
+    def address(self) -> str:
+        """Return host:port as used by the API."""
+        return f"{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """Start listening."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.protocol_port is not None:
+            self._protocol_server = await asyncio.start_server(
+                self._handle_protocol, self.host, self.protocol_port
+            )
+            self.protocol_port = self._protocol_server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._server is not None:
+            self._server.close()
+            if self._protocol_server is not None:
+                self._protocol_server.close()
+            for client in self._clients:
+                client.cancel()
+            await asyncio.gather(*self._clients, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+            if self._protocol_server is not None:
+                await self._protocol_server.wait_closed()
+                self._protocol_server = None
+
+    def start_in_thread(self) -> asyncio.AbstractEventLoop:
+        """Run the server on its own event loop in a daemon thread, for blocking clients."""
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        started.wait()
+        return loop
+
+    def names_html(self) -> bytes:
+        """Return the names page."""
+        channels = "".join(
+            OUTPUT_NAME.format(number=channel + 1, channel=channel, name=name)
+            for channel, name in enumerate(self.output_names)
+        ) + INPUT_NAME.format(name=self.input_name)
+        return NAMES_HTML.format(channels=channels).encode()
+
+    def status_cgi(self) -> bytes:
+        """Return the status page."""
+        leds = "".join(f"<led>{int(state)}</led>" for state in self.outputs)
+        return (
+            f'<response><leds>{leds}</leds><inputs><input id="0">{int(self.input)}</input></inputs></response>'
+        ).encode()
+
+    def about_html(self) -> bytes:
+        """Return the about page."""
+        mac = "00:04:A3:%02X:%02X:%02X" % tuple(self.port.to_bytes(3, "big"))
+        return ABOUT_HTML.format(name=self.name, version=self.version, mac=mac).encode()
+
+    def status_packet(self) -> bytes:
+        """Return the control protocol status packet."""
+        outputs = sum(1 << channel for channel, state in enumerate(self.outputs) if state)
+        return packet(CMD_STATUS, bytes((outputs, 0, int(self.input))))
+
+    def push_status(self) -> None:
+        """Send the status to all logged in control protocol clients."""
+        status = self.status_packet()
+        for writer in self._subscribers:
+            writer.write(status)
+
+    def switch(self, on_mask: int, off_mask: int) -> None:
+        """Switch the masked outputs on and off."""
+        for channel in range(OUTPUTS):
+            if on_mask & (1 << channel):
+                self.outputs[channel] = True
+            elif off_mask & (1 << channel):
+                self.outputs[channel] = False
+        self.push_status()
+
+    def random_change(self) -> None:
+        """Flip one random channel."""
+        channel = self._random.randrange(OUTPUTS + 1)
+        if channel == OUTPUTS:
+            self.input = not self.input
+        else:
+            self.outputs[channel] = not self.outputs[channel]
+        self.push_status()
+
+    def _route(self, target: str) -> tuple[int, bytes]:
+        url = urlsplit(target)
+        self.requests[url.path] = self.requests.get(url.path, 0) + 1
+        if url.path in ("/", "/index.html"):
+            return 200, INDEX_HTML.encode()
+        if url.path == "/names.html":
+            return 200, self.names_html()
+        if url.path == "/about.html":
+            return 200, self.about_html()
+        if url.path == "/cgi/status.cgi":
+            if self.change_rate and self._random.random() < self.change_rate:
+                self.random_change()
+            return 200, self.status_cgi()
+        return 404, b"<html><body>Not found</body></html>"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                if self.drop_rate and self._random.random() < self.drop_rate:
+                    return
+                delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+                if delay:
+                    await asyncio.sleep(delay)
+
+                _, target, _ = request_line.decode("latin-1").split(" ", 2)
+                if self._auth is not None and headers.get("authorization") != self._auth:
+                    status, body = 401, b"<html><body>401 Unauthorized</body></html>"
+                else:
+                    status, body = self._route(target)
+
+                reason = {200: "OK", 401: "Unauthorized", 404: "Not Found"}[status]
+                connection = "keep-alive" if self.keep_alive else "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {reason}\r\nContent-Type: text/html\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: {connection}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+                if not self.keep_alive:
+                    return
+        except (ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # The server is stopping
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    async def _handle_protocol(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            if self._credentials is not None:
+                writer.write(packet(CMD_AUTHENTICATE))
+                login = {}
+                while len(login) < 2:
+                    command, data = await read_packet(reader)
+                    if command in (CMD_USERNAME, CMD_PASSWORD):
+                        login[command] = data.decode()
+                if (login[CMD_USERNAME], login[CMD_PASSWORD]) != self._credentials:
+                    writer.write(packet(CMD_ACCESS_DENIED))
+                    await writer.drain()
+                    return
+            writer.write(packet(CMD_LOGGED_IN))
+            self._subscribers.add(writer)
+            while True:
+                command, data = await read_packet(reader)
+                self.requests[chr(command)] = self.requests.get(chr(command), 0) + 1
+                if command == CMD_STATUS_REQ:
+                    writer.write(self.status_packet())
+                elif command == CMD_ON:
+                    self.switch(data[0], 0)
+                elif command == CMD_OFF:
+                    self.switch(0, data[0])
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # The server is stopping
+            pass
+        finally:
+            self._subscribers.discard(writer)
+            self._clients.discard(task)
+            writer.close()
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--change-rate", type=float, default=0.0)
+    parser.add_argument("--protocol-port", type=int, help="also emulate the TCP control protocol")
+    args = parser.parse_args()
+
+    board = FakeVM201(
+        args.host,
+        args.port,
+        args.user,
+        args.password,
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        change_rate=args.change_rate,
+        protocol_port=args.protocol_port,
+    )
+    await board.start()
+    print(f"Fake VM201 listening on http://{board.address}")
+    if board.protocol_port is not None:
+        print(f"Control protocol on tcp://{board.host}:{board.protocol_port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
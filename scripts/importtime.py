@@ -0,0 +1,178 @@
+"""Check the import time of the integration against a budget.
+
+Imports the integration and its platforms in a fresh interpreter with
+``python -X importtime`` and adds up the self time of every module loaded on
+top of what Home Assistant already imported. Fails if that exceeds the
+budget or if a module that must only be loaded on demand (BeautifulSoup,
+http.client) was imported:
+
+    python scripts/importtime.py
+    python scripts/importtime.py --budget 20 --verbose
+
+Without Home Assistant installed only the modules that do not depend on it
+are imported, which still covers the API stack. That also works on Python
+3.11, which cannot parse the package __init__; the full check needs Home
+Assistant and so the Python it requires (3.12 or later).
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+from pathlib import Path
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "custom_components.velleman_vm201"
+SOURCE = ROOT / "custom_components" / "velleman_vm201"
+
+# Budget (ms) for the modules the integration adds to a Home Assistant start
+DEFAULT_BUDGET = 30.0
+# Modules only the fallback parsers need, and http.client, which the API does
+# not use as it speaks HTTP over asyncio streams
+LAZY_MODULES = ("bs4", "soupsieve", "http.client")
+HASS_MODULES = ("homeassistant", "voluptuous")
+# Standard library modules Home Assistant has loaded before any integration
+PRELOADED = ("asyncio", "dataclasses", "datetime", "enum", "json", "logging", "ssl", "typing")
+MARKER = "-- integration --"
+
+CHILD = """
+import json, sys, types
+sys.path.insert(0, {root!r})
+baseline, modules = {baseline!r}, {modules!r}
+for name in {preloaded!r}:
+    __import__(name)
+try:
+    for name in baseline:
+        __import__(name)
+except ImportError:
+    # Register the package without running __init__, which needs Home Assistant
+    package = types.ModuleType({package!r})
+    package.__path__ = [{source!r}]
+    sys.modules[{package!r}] = package
+    modules = {standalone!r}
+print({marker!r}, file=sys.stderr, flush=True)
+for name in modules:
+    __import__(name)
+print(json.dumps([modules, [name for name in {lazy!r} if name in sys.modules]]))
+"""
+
+
+def _imports(path: Path) -> tuple[set[str], set[str]] | None:
+    """Return the Home Assistant and the package modules a module imports.
+
+    Return None if this Python cannot parse the module.
+    """
+    external: set[str] = set()
+    local: set[str] = set()
+    try:
+        tree = ast.parse(path.read_text())
+    except SyntaxError:
+        return None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            external.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and not node.level:
+            external.add(node.module)
+        elif isinstance(node, ast.ImportFrom):
+            # "from . import X" runs the package __init__
+            local.add(node.module or "__init__")
+    return {name for name in external if name.split(".")[0] in HASS_MODULES}, local
+
+
+def _plan() -> tuple[list[str], list[str], list[str]]:
+    """Return the Home Assistant modules to preload, all modules and those without Home Assistant."""
+    baseline: set[str] = set()
+    local: dict[str, set[str]] = {}
+    needs_hass: set[str] = set()
+    for path in SOURCE.glob("*.py"):
+        if (imports := _imports(path)) is None:
+            # __init__ uses syntax of Python 3.12, which Home Assistant requires anyway
+            local[path.stem] = set()
+            needs_hass.add(path.stem)
+            continue
+        external, local[path.stem] = imports
+        baseline |= external
+        if external:
+            needs_hass.add(path.stem)
+    # A module also needs Home Assistant if one of the modules it imports does
+    while grown := {name for name, deps in local.items() if deps & needs_hass} - needs_hass:
+        needs_hass |= grown
+    # __main__ is the command line tool, Home Assistant never imports it
+    modules = sorted(name for name in local if name not in ("__init__", "__main__"))
+    return (
+        sorted(baseline),
+        [PACKAGE] + [f"{PACKAGE}.{name}" for name in modules],
+        [f"{PACKAGE}.{name}" for name in modules if name not in needs_hass],
+    )
+
+
+def measure() -> tuple[list[str], dict[str, float], list[str]]:
+    """Import the integration once.
+
+    Return the modules imported, the self time (ms) of every new module and
+    the modules of LAZY_MODULES that ended up in sys.modules.
+    """
+    baseline, modules, standalone = _plan()
+    code = CHILD.format(
+        root=str(ROOT),
+        baseline=baseline,
+        modules=modules,
+        standalone=standalone,
+        package=PACKAGE,
+        source=str(SOURCE),
+        marker=MARKER,
+        preloaded=PRELOADED,
+        lazy=LAZY_MODULES,
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if proc.returncode:
+        sys.exit(proc.stderr)
+    _, _, report = proc.stderr.partition(MARKER)
+    times: dict[str, float] = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(self_us) / 1000
+    modules, eager = json.loads(proc.stdout)
+    return modules, times, eager
+
+
+def main() -> None:
+    """Run the check."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="budget (ms)")
+    parser.add_argument("--rounds", type=int, default=5, help="imports to take the best of")
+    parser.add_argument("--verbose", action="store_true", help="list the slowest modules")
+    args = parser.parse_args()
+
+    # The first import may compile bytecode; keep the fastest round
+    rounds = [measure() for _ in range(max(1, args.rounds))]
+    modules, times, eager = min(rounds, key=lambda result: sum(result[1].values()))
+    total = sum(times.values())
+
+    print(f"{len(modules)} integration modules, {len(times)} modules loaded, {total:.1f} ms")
+    if args.verbose:
+        for name, elapsed in sorted(times.items(), key=lambda item: -item[1])[:15]:
+            print(f"  {elapsed:8.2f} ms  {name}")
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+    if total > args.budget:
+        print(f"FAIL: {total:.1f} ms exceeds the budget of {args.budget:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""Load test the integration with many fake boards in one Home Assistant instance.
+
+Starts N fake VM201 boards on loopback, adds one config entry per board
+through the config flow of the integration and flips random relays on the
+boards for a while. Reports event loop lag, executor queue depth, memory per
+board and how long a change takes to reach the coordinator and the output
+binary sensor. Results are saved as JSON under .benchmarks/, next to those of the
+benchmark tests, and can be compared with an earlier run:
+
+    python scripts/scale.py --boards 200 --duration 120
+    python scripts/scale.py --push --compare .benchmarks/scale_0.0.1_ca6ea0e.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "scripts")]
+
+from fake_vm201 import OUTPUTS, FakeVM201  # noqa: E402
+
+from homeassistant import bootstrap  # noqa: E402
+from homeassistant.config_entries import SOURCE_USER, ConfigEntry, ConfigEntryState  # noqa: E402
+from homeassistant.const import (  # noqa: E402
+    CONF_HOST,
+    CONF_PASSWORD,
+    CONF_SCAN_INTERVAL,
+    CONF_USERNAME,
+    EVENT_STATE_CHANGED,
+)
+from homeassistant.core import Event, HomeAssistant, callback  # noqa: E402
+from homeassistant.helpers import entity_registry as er  # noqa: E402
+
+from custom_components.velleman_vm201.const import (  # noqa: E402
+    CONF_PROTOCOL_PORT,
+    CONF_PUSH_UPDATES,
+    DOMAIN,
+)
+
+MANIFEST = ROOT / "custom_components" / "velleman_vm201" / "manifest.json"
+RESULTS = ROOT / ".benchmarks"
+
+USER = "admin"
+PWD = "secret"
+# Seconds between two samples of the event loop lag and executor queue
+SAMPLE_INTERVAL = 0.05
+
+
+def _revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _summary(values: list[float]) -> dict[str, float]:
+    """Return the percentiles of the values, in ms."""
+    if not values:
+        return {"count": 0}
+    values = sorted(value * 1000 for value in values)
+
+    def pct(q: float) -> float:
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values),
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "max": values[-1],
+    }
+
+
+def _rss() -> int:
+    """Return the resident set size of the process in bytes."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak instead of current usage, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Propagation:
+    """Track how long relay changes take to reach the coordinators and entities."""
+
+    def __init__(self) -> None:
+        """Initialise."""
+        # (entry_id, channel) -> (time of the change, new state)
+        self.pending: dict[tuple[str, int], tuple[float, bool]] = {}
+        self.entity_pending: dict[tuple[str, int], tuple[float, bool]] = {}
+        self.coordinator: list[float] = []
+        self.entity: list[float] = []
+        self.changes = 0
+        self.superseded = 0
+        # output binary sensor entity_id -> (entry_id, channel)
+        self.outputs: dict[str, tuple[str, int]] = {}
+
+    def changed(self, entry_id: str, channel: int, state: bool) -> None:
+        """Record a change made on a board."""
+        key = (entry_id, channel)
+        if key in self.pending:
+            self.superseded += 1
+        self.pending[key] = self.entity_pending[key] = (perf_counter(), state)
+        self.changes += 1
+
+    def watch(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Check the pending changes of a board on every coordinator update."""
+        coordinator = entry.runtime_data.coordinator
+        controller = coordinator.api.controller_name
+
+        @callback
+        def updated() -> None:
+            if coordinator.data is None:
+                return
+            now = perf_counter()
+            for channel in range(OUTPUTS):
+                key = (entry.entry_id, channel)
+                if (pending := self.pending.get(key)) is None:
+                    continue
+                device = coordinator.get_device_by_unique_id(f"{controller}_O{channel}")
+                if device is not None and coordinator.data.state(device) == pending[1]:
+                    del self.pending[key]
+                    self.coordinator.append(now - pending[0])
+
+        entry.async_on_unload(coordinator.async_add_listener(updated))
+        registry = er.async_get(hass)
+        for entity in er.async_entries_for_config_entry(registry, entry.entry_id):
+            if entity.domain == "binary_sensor" and entity.unique_id.startswith(
+                f"{DOMAIN}-{controller}_O"
+            ):
+                self.outputs[entity.entity_id] = (entry.entry_id, int(entity.unique_id[-1]))
+
+    @callback
+    def state_changed(self, event: Event) -> None:
+        """Match output state changes with the pending changes."""
+        if (key := self.outputs.get(event.data["entity_id"])) is None:
+            return
+        if (pending := self.entity_pending.get(key)) is None or event.data["new_state"] is None:
+            return
+        if (event.data["new_state"].state == "on") == pending[1]:
+            del self.entity_pending[key]
+            self.entity.append(perf_counter() - pending[0])
+
+
+async def monitor(lag: list[float], queue: list[int]) -> None:
+    """Sample the event loop lag and the executor queue depth until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(SAMPLE_INTERVAL)
+        lag.append(max(0.0, loop.time() - start - SAMPLE_INTERVAL))
+        executor = getattr(loop, "_default_executor", None)
+        queue.append(executor._work_queue.qsize() if executor is not None else 0)  # noqa: SLF001
+
+
+async def add_board(hass: HomeAssistant, board: FakeVM201, options: dict) -> ConfigEntry:
+    """Add a config entry for a board through the config flow."""
+    flow = hass.config_entries.flow
+    result = await flow.async_init(DOMAIN, context={"source": SOURCE_USER})
+    result = await flow.async_configure(result["flow_id"], {"next_step_id": "manual"})
+    result = await flow.async_configure(
+        result["flow_id"], {CONF_HOST: board.address, CONF_USERNAME: USER, CONF_PASSWORD: PWD}
+    )
+    if result["type"] != "create_entry":
+        raise RuntimeError(f"Config flow for {board.address} failed: {result}")
+    entry = result["result"]
+    if options:
+        result = await hass.config_entries.options.async_init(entry.entry_id)
+        await hass.config_entries.options.async_configure(
+            result["flow_id"],
+            options | ({CONF_PROTOCOL_PORT: board.protocol_port} if options.get(CONF_PUSH_UPDATES) else {}),
+        )
+    return entry
+
+
+async def churn(
+    boards: list[tuple[FakeVM201, ConfigEntry]], rate: float, propagation: Propagation, rng: random.Random
+) -> None:
+    """Flip random relays at the given rate (changes per second) until cancelled."""
+    while True:
+        await asyncio.sleep(rng.expovariate(rate))
+        board, entry = rng.choice(boards)
+        channel = rng.randrange(OUTPUTS)
+        state = not board.outputs[channel]
+        board.switch(*((1 << channel, 0) if state else (0, 1 << channel)))
+        propagation.changed(entry.entry_id, channel, state)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the load test and return the report."""
+    rng = random.Random(args.seed)
+    # Every board gets its own port and name; the config flow derives the
+    # unique ids of its channels from the address, so no two boards collide.
+    boards = [
+        FakeVM201(
+            user=USER,
+            pwd=PWD,
+            latency=args.latency,
+            jitter=args.jitter,
+            name=f"Relay card {number}",
+            seed=rng.randrange(1 << 32),
+            protocol_port=0 if args.push else None,
+        )
+        for number in range(args.boards)
+    ]
+    await asyncio.gather(*(board.start() for board in boards))
+
+    options: dict[str, int | bool] = {}
+    if args.scan_interval is not None:
+        options[CONF_SCAN_INTERVAL] = args.scan_interval
+    if args.push:
+        options[CONF_PUSH_UPDATES] = True
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        await bootstrap.async_from_config_dict({"homeassistant": {"time_zone": "UTC"}}, hass)
+        await hass.async_start()
+        await hass.async_block_till_done()
+
+        lag: list[float] = []
+        queue: list[int] = []
+        monitor_task = asyncio.create_task(monitor(lag, queue))
+        rss_before = _rss()
+
+        start = perf_counter()
+        entries = [await add_board(hass, board, options) for board in boards]
+        await hass.async_block_till_done()
+        setup = perf_counter() - start
+        rss_after = _rss()
+        setup_lag, lag[:] = lag[:], []
+        setup_queue, queue[:] = queue[:], []
+
+        propagation = Propagation()
+        for entry in entries:
+            if entry.state is ConfigEntryState.LOADED:
+                propagation.watch(hass, entry)
+        hass.bus.async_listen(EVENT_STATE_CHANGED, propagation.state_changed)
+        requests_before = sum(sum(board.requests.values()) for board in boards)
+
+        churn_task = asyncio.create_task(
+            churn(list(zip(boards, entries, strict=True)), args.changes, propagation, rng)
+        )
+        await asyncio.sleep(args.duration)
+        churn_task.cancel()
+        # Give the last changes one poll to arrive
+        await asyncio.sleep(args.settle)
+        monitor_task.cancel()
+        await asyncio.gather(churn_task, monitor_task, return_exceptions=True)
+        requests = sum(sum(board.requests.values()) for board in boards) - requests_before
+
+        registry = er.async_get(hass)
+        entities = [
+            entity
+            for entry in entries
+            for entity in er.async_entries_for_config_entry(registry, entry.entry_id)
+        ]
+        loaded = sum(entry.state is ConfigEntryState.LOADED for entry in entries)
+
+        await hass.async_stop()
+    await asyncio.gather(*(board.stop() for board in boards))
+
+    return {
+        "boards": args.boards,
+        "loaded": loaded,
+        "entities": len(entities),
+        "boards_with_entities": len({entity.config_entry_id for entity in entities}),
+        "setup": {
+            "seconds": setup,
+            "loop_lag": _summary(setup_lag),
+            "executor_queue_max": max(setup_queue, default=0),
+        },
+        "loop_lag": _summary(lag),
+        "executor_queue": {
+            "mean": statistics.fmean(queue) if queue else 0.0,
+            "max": max(queue, default=0),
+        },
+        "memory": {
+            "rss_mb": rss_after / 2**20,
+            "per_board_kb": (rss_after - rss_before) / args.boards / 1024,
+        },
+        "requests_per_second": requests / (args.duration + args.settle),
+        "propagation": {
+            "changes": propagation.changes,
+            "superseded": propagation.superseded,
+            "lost": len(propagation.pending),
+            "coordinator": _summary(propagation.coordinator),
+            "entity": _summary(propagation.entity),
+        },
+    }
+
+
+# Metrics printed and compared, as (label, path in the report)
+METRICS = (
+    ("setup s", ("setup", "seconds")),
+    ("loop lag p95 ms", ("loop_lag", "p95")),
+    ("loop lag max ms", ("loop_lag", "max")),
+    ("executor queue max", ("executor_queue", "max")),
+    ("memory per board KiB", ("memory", "per_board_kb")),
+    ("requests/s", ("requests_per_second",)),
+    ("coordinator p50 ms", ("propagation", "coordinator", "p50")),
+    ("coordinator p95 ms", ("propagation", "coordinator", "p95")),
+    ("entity p50 ms", ("propagation", "entity", "p50")),
+    ("entity p95 ms", ("propagation", "entity", "p95")),
+    ("changes lost", ("propagation", "lost")),
+)
+
+
+def _get(report: dict, path: tuple[str, ...]) -> float | None:
+    for key in path:
+        if not isinstance(report, dict) or key not in report:
+            return None
+        report = report[key]
+    return report
+
+
+def _print(report: dict, baseline: dict | None) -> None:
+    print(
+        f"{report['boards']} boards, {report['loaded']} loaded, "
+        f"{report['entities']} entities on {report['boards_with_entities']} boards"
+    )
+    print(f"{'metric':24} {'value':>12}" + ("   vs baseline" if baseline else ""))
+    for label, path in METRICS:
+        if (value := _get(report, path)) is None:
+            continue
+        line = f"{label:24} {value:12.2f}"
+        if baseline and (previous := _get(baseline, path)):
+            line += f"   {value / previous:8.2f}x"
+        print(line)
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of random changes")
+    parser.add_argument("--changes", type=float, default=20.0, help="relay changes per second, all boards")
+    parser.add_argument("--settle", type=float, default=10.0, help="seconds to wait for the last changes")
+    parser.add_argument("--latency", type=float, default=0.01, help="fake board latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="fake board jitter (s)")
+    parser.add_argument("--scan-interval", type=int, help="scan interval option (s)")
+    parser.add_argument("--push", action="store_true", help="enable push updates")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="where to store the report")
+    parser.add_argument("--compare", type=Path, help="earlier report to compare with")
+    args = parser.parse_args()
+
+    report = await run(args)
+
+    version = json.loads(MANIFEST.read_text())["version"]
+    revision = _revision()
+    output = args.output or RESULTS / f"scale_{version}_{revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {"version": version, "revision": revision, "args": vars(args) | {"output": None, "compare": None}}
+            | report,
+            indent=2,
+        )
+    )
+
+    _print(report, json.loads(args.compare.read_text()) if args.compare else None)
+    print(f"Report saved to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
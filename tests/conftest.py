@@ -0,0 +1,37 @@
+"""Shared setup of the tests.
+
+The package __init__ imports Home Assistant, which the parser, API and
+protocol modules do not need. Without Home Assistant installed the package
+is registered without running its __init__, like the command line tool
+does, so those modules can still be tested.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+import sys
+import types
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "custom_components.velleman_vm201"
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+sys.path[:0] = [str(ROOT), str(ROOT / "scripts")]
+
+if importlib.util.find_spec("homeassistant") is None:
+    _package = types.ModuleType(PACKAGE)
+    _package.__path__ = [str(ROOT / "custom_components" / "velleman_vm201")]
+    sys.modules[PACKAGE] = _package
+
+
+@pytest.fixture
+def page():
+    """Return a page from the fixtures directory."""
+
+    def load(name: str) -> bytes:
+        return (FIXTURES / name).read_bytes()
+
+    return load
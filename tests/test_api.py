@@ -0,0 +1,92 @@
+"""The asyncio API against the fake board."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from fake_vm201 import FakeVM201
+import pytest
+
+from custom_components.velleman_vm201.api import APIAuthError, AsyncAPI, AsyncConnectionManager
+
+USER = "admin"
+PWD = "secret"
+
+
+def run_with_board(test: Callable[[FakeVM201], Awaitable[None]], **options) -> None:
+    """Run a test coroutine against a fake board on a fresh event loop."""
+
+    async def run() -> None:
+        board = FakeVM201(user=USER, pwd=PWD, **options)
+        await board.start()
+        try:
+            await test(board)
+        finally:
+            await board.stop()
+
+    asyncio.run(run())
+
+
+def test_get_all() -> None:
+    """The three pages are read over the board's connections."""
+
+    async def test(board: FakeVM201) -> None:
+        api = AsyncAPI(board.address, USER, PWD)
+        try:
+            devices, info, status = await api.get_all()
+        finally:
+            await api.disconnect()
+        assert len(devices) == 9
+        assert info.model == "VM201"
+        assert status.outputs == [False] * 8
+        assert api.connection.connects <= api.max_connections
+
+    run_with_board(test)
+
+
+def test_get_all_failure_cancels_requests() -> None:
+    """A failed page raises its own error and leaves no request running."""
+
+    async def test(board: FakeVM201) -> None:
+        api = AsyncAPI(board.address, USER, "wrong")
+        try:
+            with pytest.raises(APIAuthError):
+                await api.get_all()
+            assert not [
+                task
+                for task in asyncio.all_tasks()
+                if task.get_coro().__qualname__.startswith("AsyncAPI.")
+            ]
+        finally:
+            await api.disconnect()
+
+    run_with_board(test)
+
+
+def test_cancelled_request_closes_connection(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A connection with a half read response is closed, not left open or reused."""
+    closed = []
+    close = AsyncConnectionManager._close
+    monkeypatch.setattr(
+        AsyncConnectionManager, "_close", staticmethod(lambda conn: closed.append(conn) or close(conn))
+    )
+
+    async def test(board: FakeVM201) -> None:
+        api = AsyncAPI(board.address, USER, PWD, max_connections=1)
+        try:
+            request = asyncio.create_task(api.get_status())
+            await asyncio.sleep(0.05)
+            request.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await request
+            assert len(closed) == 1
+            assert closed[0][1].is_closing()
+            board.latency = 0
+            assert (await api.get_status()).outputs == [False] * 8
+            assert api.connection.connects == 2
+            assert api.connection.reuses == 0
+        finally:
+            await api.disconnect()
+
+    run_with_board(test, latency=0.5)
@@ -0,0 +1,145 @@
+"""Benchmarks of the poll path against the fake board.
+
+Runs with pytest-benchmark. Every test also checks that the fast path was
+taken: no BeautifulSoup fallback, one reused keep-alive connection and no
+parsing of repeated responses. No timing is asserted, as that depends on
+the machine; regressions are caught by comparing with a baseline saved on
+the same machine, under .benchmarks/:
+
+    python -m pytest tests/test_benchmark.py --benchmark-autosave
+    python -m pytest tests/test_benchmark.py --benchmark-compare --benchmark-compare-fail=median:25%
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterator
+import tempfile
+from types import SimpleNamespace
+from typing import TypeVar
+
+from fake_vm201 import FakeVM201
+import pytest
+
+from custom_components.velleman_vm201 import parser
+from custom_components.velleman_vm201.api import AsyncAPI
+
+pytest.importorskip("pytest_benchmark")
+
+_T = TypeVar("_T")
+
+USER = "admin"
+PWD = "secret"
+
+
+@pytest.fixture(autouse=True)
+def no_soup(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Fail if a page falls back to BeautifulSoup."""
+    for name in ("_soup_names", "_soup_status", "_soup_about"):
+
+        def fail(content: bytes, name: str = name):
+            pytest.fail(f"{name} used for a page in the firmware layout")
+
+        monkeypatch.setattr(parser, name, fail)
+
+
+@pytest.fixture(scope="module")
+def board() -> Iterator[tuple[FakeVM201, asyncio.AbstractEventLoop]]:
+    """Run a fake board with changing channels on its own event loop."""
+    board = FakeVM201(user=USER, pwd=PWD, change_rate=0.2, seed=1)
+    loop = board.start_in_thread()
+    yield board, loop
+    asyncio.run_coroutine_threadsafe(board.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def _run(loop: asyncio.AbstractEventLoop, func: Callable[[], Awaitable[_T]]) -> Callable[[], _T]:
+    """Return a blocking call that runs a coroutine on the loop of the board."""
+    return lambda: asyncio.run_coroutine_threadsafe(func(), loop).result()
+
+
+@pytest.mark.parametrize(
+    ("page", "parse"),
+    [
+        ("names_html", lambda api, content: api.parse_devices(content)),
+        ("status_cgi", lambda api, content: parser.parse_status(content)),
+        ("about_html", lambda api, content: api.parse_device_info(content)),
+    ],
+)
+def test_parse(benchmark, board, page: str, parse) -> None:
+    """Parse a page with the precompiled parsers."""
+    api = AsyncAPI(board[0].address)
+    content = getattr(board[0], page)()
+    assert benchmark(parse, api, content)
+
+
+def test_api_get_devices(benchmark, board) -> None:
+    """Read the names page with the AsyncAPI."""
+    address, loop = board[0].address, board[1]
+    api = AsyncAPI(address, USER, PWD, max_connections=1)
+    try:
+        devices = benchmark(_run(loop, api.get_devices))
+        assert len(devices) == 9
+        # The names do not change, so they are parsed once
+        assert _run(loop, api.get_devices)() is devices
+        assert api.connection.connects == 1
+    finally:
+        _run(loop, api.disconnect)()
+
+
+def test_api_get_status(benchmark, board) -> None:
+    """Read the status page with the AsyncAPI."""
+    address, loop = board[0].address, board[1]
+    api = AsyncAPI(address, USER, PWD)
+    try:
+        benchmark(_run(loop, api.get_status))
+        assert api.connection.connects <= api.max_connections
+    finally:
+        _run(loop, api.disconnect)()
+
+
+def test_api_get_device_info(benchmark, board) -> None:
+    """Read the about page with the AsyncAPI."""
+    address, loop = board[0].address, board[1]
+    api = AsyncAPI(address, USER, PWD, max_connections=1)
+    try:
+        assert benchmark(_run(loop, api.get_device_info)).model == "VM201"
+        assert api.connection.connects == 1
+    finally:
+        _run(loop, api.disconnect)()
+
+
+@pytest.mark.parametrize("topology", [False, True], ids=["poll", "topology"])
+def test_coordinator_cycle(benchmark, board, topology: bool) -> None:
+    """Run VellemanCoordinator.async_update_data, with or without the topology pages."""
+    core = pytest.importorskip("homeassistant.core")
+    from custom_components.velleman_vm201.coordinator import (  # pylint: disable=import-outside-toplevel
+        VellemanCoordinator,
+    )
+
+    address, loop = board[0].address, board[1]
+    with tempfile.TemporaryDirectory() as config_dir:
+
+        async def create() -> VellemanCoordinator:
+            hass = core.HomeAssistant(config_dir)
+            entry = SimpleNamespace(
+                entry_id="benchmark",
+                unique_id="benchmark",
+                data={"host": address, "username": USER, "password": PWD, "controller_name": "benchmark"},
+                options={},
+            )
+            coordinator = VellemanCoordinator(hass, entry)
+            coordinator.data = await coordinator.async_update_data()
+            return coordinator
+
+        coordinator = _run(loop, create)()
+
+        async def poll() -> None:
+            coordinator._topology_requested = topology  # noqa: SLF001
+            coordinator.data = await coordinator.async_update_data()
+
+        try:
+            benchmark(_run(loop, poll))
+            assert coordinator.api.connection.connects <= coordinator.api.max_connections
+        finally:
+            _run(loop, coordinator.api.disconnect)()
@@ -0,0 +1,84 @@
+"""The circuit breaker of the poll path."""
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.velleman_vm201 import breaker
+from custom_components.velleman_vm201.breaker import BreakerState, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Control the clock of the breaker, without jitter."""
+    now = [1000.0]
+    monkeypatch.setattr(breaker, "monotonic", lambda: now[0])
+    monkeypatch.setattr(breaker.random, "uniform", lambda low, high: 1.0)
+    return now
+
+
+def test_opens_after_threshold(clock: list[float]) -> None:
+    """Consecutive failures open the circuit, which then refuses requests."""
+    circuit = CircuitBreaker(failure_threshold=3, base_backoff=15, max_backoff=600)
+    for _ in range(2):
+        circuit.record_failure()
+        assert circuit.state is BreakerState.CLOSED
+        assert circuit.allow_request()
+    circuit.record_failure()
+    assert circuit.state is BreakerState.OPEN
+    assert not circuit.allow_request()
+    assert circuit.opened == 1
+    assert circuit.retry_in == 15
+
+
+def test_success_resets_failures(clock: list[float]) -> None:
+    """Only consecutive failures count towards the threshold."""
+    circuit = CircuitBreaker(failure_threshold=3)
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit.record_success()
+    circuit.record_failure()
+    assert circuit.state is BreakerState.CLOSED
+    assert circuit.failures == 1
+
+
+def test_half_open_probe(clock: list[float]) -> None:
+    """After the backoff one probe is let through; its result closes or reopens the circuit."""
+    circuit = CircuitBreaker(failure_threshold=1, base_backoff=15, max_backoff=40)
+    circuit.record_failure()
+    clock[0] += 14
+    assert not circuit.allow_request()
+    clock[0] += 1
+    assert circuit.allow_request()
+    assert circuit.state is BreakerState.HALF_OPEN
+
+    # A failed probe reopens the circuit with a doubled backoff, up to the maximum
+    circuit.record_failure()
+    assert circuit.state is BreakerState.OPEN
+    assert circuit.backoff == 30
+    clock[0] += 30
+    assert circuit.allow_request()
+    circuit.record_failure()
+    assert circuit.backoff == 40
+    assert circuit.opened == 1
+
+    clock[0] += 40
+    assert circuit.allow_request()
+    circuit.record_success()
+    assert circuit.state is BreakerState.CLOSED
+    assert (circuit.failures, circuit.backoff) == (0, 0.0)
+    assert circuit.allow_request()
+
+
+def test_as_dict(clock: list[float]) -> None:
+    """The diagnostics show the state and the time to the next probe."""
+    circuit = CircuitBreaker(failure_threshold=1, base_backoff=15)
+    circuit.record_failure()
+    clock[0] += 5
+    assert circuit.as_dict() == {
+        "state": "open",
+        "consecutive_failures": 1,
+        "times_opened": 1,
+        "backoff": 15,
+        "retry_in": 10,
+    }
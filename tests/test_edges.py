@@ -0,0 +1,29 @@
+"""The edge buffers of the inputs."""
+
+from __future__ import annotations
+
+from custom_components.velleman_vm201.edges import EdgeBuffer
+
+
+def test_pulse_counting() -> None:
+    """Only changes are edges, the first sample sets the state and rising edges are pulses."""
+    edges = EdgeBuffer(capacity=8)
+    assert not edges.record(True, 1.0)
+    assert not edges.record(True, 2.0)
+    assert edges.record(False, 3.0)
+    assert edges.record(True, 4.0)
+    assert not edges.record(True, 5.0)
+    assert (edges.edges, edges.pulses, edges.last_change) == (2, 1, 4.0)
+    assert list(edges) == [(3.0, False), (4.0, True)]
+
+
+def test_wrap_around() -> None:
+    """A full buffer keeps the newest edges in order while the counters go on."""
+    edges = EdgeBuffer(capacity=4)
+    edges.record(False, 0.0)
+    for second in range(1, 11):
+        edges.record(second % 2 == 1, float(second))
+    assert len(edges) == edges.capacity == 4
+    assert list(edges) == [(7.0, True), (8.0, False), (9.0, True), (10.0, False)]
+    assert (edges.edges, edges.pulses) == (10, 5)
+    assert edges.as_dict()["buffered"] == list(edges)
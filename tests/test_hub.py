@@ -0,0 +1,59 @@
+"""The polling hub shared by all boards."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.velleman_vm201.hub import VellemanHub
+
+
+def test_concurrency_limit() -> None:
+    """No more polls than the limit run at the same time, the others wait."""
+    hub = VellemanHub(max_concurrent=2)
+    running = []
+
+    async def poll() -> None:
+        async with hub.poll_slot():
+            running.append(hub.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run() -> None:
+        await asyncio.gather(*(poll() for _ in range(7)))
+
+    asyncio.run(run())
+    assert max(running) == hub.max_in_flight == 2
+    assert hub.in_flight == 0
+    assert hub.stats["polls"] == 7
+    assert hub.stats["avg_wait_time"] > 0
+
+
+def test_failed_poll_frees_slot() -> None:
+    """A poll that raises is counted as failed and gives its slot back."""
+    hub = VellemanHub(max_concurrent=1)
+
+    async def run() -> None:
+        with pytest.raises(ConnectionError):
+            async with hub.poll_slot():
+                raise ConnectionError
+        async with asyncio.timeout(1), hub.poll_slot():
+            pass
+
+    asyncio.run(run())
+    assert (hub.polls, hub.failures, hub.in_flight) == (2, 1, 0)
+
+
+def test_phase_offsets() -> None:
+    """Registered boards get distinct offsets, and a freed slot is reused."""
+    hub = VellemanHub()
+    for key in ("a", "b", "c"):
+        hub.register(key, None)
+    offsets = [hub.phase_offset(key, 60) for key in ("a", "b", "c")]
+    assert len(set(offsets)) == 3
+    assert all(0 <= offset < 60 for offset in offsets)
+
+    hub.unregister("b")
+    hub.register("d", None)
+    assert hub.phase_offset("d", 60) == offsets[1]
+    assert hub.stats["boards"] == 3
@@ -0,0 +1,20 @@
+"""The import path of the integration stays free of on-demand modules.
+
+Runs scripts/importtime.py in a fresh interpreter. Without Home Assistant
+only the modules that do not need it are imported, which works on Python
+3.11 and later; with Home Assistant installed (Python 3.12 or later) the
+package and all its platforms are.
+"""
+
+from __future__ import annotations
+
+import importtime
+
+
+def test_lazy_modules_not_imported() -> None:
+    """Importing the integration loads neither BeautifulSoup nor http.client."""
+    modules, times, eager = importtime.measure()
+    assert f"{importtime.PACKAGE}.api" in modules
+    assert f"{importtime.PACKAGE}.parser" in modules
+    assert eager == []
+    assert not set(times) & set(importtime.LAZY_MODULES)
@@ -0,0 +1,122 @@
+"""The precompiled page parsers against the BeautifulSoup ones."""
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.velleman_vm201 import parser
+from custom_components.velleman_vm201.api import AsyncAPI, DeviceType
+from custom_components.velleman_vm201.parser import (
+    AboutInfo,
+    NamesEntry,
+    StatusInfo,
+    parse_about,
+    parse_names,
+    parse_status,
+)
+
+pytest.importorskip("bs4")
+
+NAMES = [
+    NamesEntry("0", "output", "Pump"),
+    NamesEntry("1", "output", "Heating & fan"),
+    NamesEntry("2", "output", 'Gate "north"'),
+    *(NamesEntry(str(channel), "output", f"Relay {channel + 1}") for channel in range(3, 8)),
+    NamesEntry("0", "input", "Door"),
+]
+ABOUT = AboutInfo("Ethernet relay card", "Velleman Components", "VM201", "1.0.3")
+
+
+@pytest.fixture
+def soup_calls(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Record the pages that fell back to BeautifulSoup."""
+    calls: list[str] = []
+    for name in ("_soup_names", "_soup_status", "_soup_about"):
+
+        def spy(content: bytes, name: str = name, soup=getattr(parser, name)):
+            calls.append(name)
+            return soup(content)
+
+        monkeypatch.setattr(parser, name, spy)
+    return calls
+
+
+def test_names(page) -> None:
+    """The names page gives the same channels on both paths."""
+    content = page("names.html")
+    assert parser._fast_names(content) == NAMES
+    assert parser._soup_names(content) == NAMES
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        (
+            "status.xml",
+            StatusInfo([True, False, False, True, False, False, False, True], [True]),
+        ),
+        # The input state is the text after an empty <input/> tag
+        (
+            "status_input_text.xml",
+            StatusInfo([False, True, False, False, False, False, True, False], [True]),
+        ),
+    ],
+)
+def test_status(page, name: str, expected: StatusInfo) -> None:
+    """The status page gives the same states on both paths."""
+    content = page(name)
+    assert parser._fast_status(content) == expected
+    assert parser._soup_status(content) == expected
+
+
+def test_about(page) -> None:
+    """The about page gives the same board info on both paths."""
+    content = page("about.html")
+    assert parser._fast_about(content) == ABOUT
+    assert parser._soup_about(content) == ABOUT
+
+
+def test_known_markup_skips_soup(page, soup_calls: list[str]) -> None:
+    """Pages in the firmware layout never reach BeautifulSoup."""
+    assert parse_names(page("names.html")) == NAMES
+    assert parse_status(page("status.xml")).inputs == [True]
+    assert parse_about(page("about.html")) == ABOUT
+    assert soup_calls == []
+
+
+def test_names_fallback(page, soup_calls: list[str]) -> None:
+    """A names page with wrapped paragraphs is parsed by BeautifulSoup."""
+    content = page("names.html").replace(b'<form action="names.html" method="post">', b"<div>")
+    content = content.replace(b"</form>", b"</div>")
+    assert parse_names(content) == NAMES
+    assert soup_calls == ["_soup_names"]
+
+
+def test_status_fallback(page, soup_calls: list[str]) -> None:
+    """A status page with upper case tags is parsed by BeautifulSoup."""
+    content = page("status.xml").replace(b"led>", b"LED>").replace(b"leds>", b"LEDS>")
+    assert parse_status(content) == parse_status(page("status.xml"))
+    assert soup_calls == ["_soup_status"]
+
+
+def test_about_fallback(page, soup_calls: list[str]) -> None:
+    """An about page with a paragraph in the footer is parsed by BeautifulSoup."""
+    content = page("about.html").replace(
+        b"Copyright Velleman Components", b"<p>Copyright Velleman Components</p>"
+    )
+    assert parse_about(content) == ABOUT
+    assert soup_calls == ["_soup_about"]
+
+
+def test_devices(page) -> None:
+    """The API builds numbered devices and the board info from the parsed pages."""
+    api = AsyncAPI("192.168.1.20")
+    devices = api.parse_devices(page("names.html"))
+    assert [(device.device_type, device.device_id, device.device_unique_id) for device in devices] == [
+        *((DeviceType.OUTPUT_SENSOR, channel, f"VM201_O{channel}") for channel in range(8)),
+        (DeviceType.INPUT_SENSOR, 0, "VM201_I0"),
+    ]
+    assert devices[1].name == "Heating & fan"
+
+    info = api.parse_device_info(page("about.html"))
+    assert (info.name, info.manufacturer, info.model, info.version) == ABOUT
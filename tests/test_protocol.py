@@ -0,0 +1,184 @@
+"""The TCP control protocol client against the emulator of the fake board."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from fake_vm201 import FakeVM201, packet
+import pytest
+
+from custom_components.velleman_vm201 import protocol
+from custom_components.velleman_vm201.api import APIAuthError
+from custom_components.velleman_vm201.protocol import (
+    CMD_LOGGED_IN,
+    CMD_STATUS,
+    PacketError,
+    ProtocolClient,
+    StatusPacket,
+    checksum,
+    decode_status,
+    encode_packet,
+    read_packet,
+)
+
+USER = "admin"
+PWD = "secret"
+
+
+async def _read(data: bytes) -> tuple[int, bytes]:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return await read_packet(reader)
+
+
+def test_encode_packet() -> None:
+    """Packets are framed with their length and a checksum that sums to zero."""
+    encoded = encode_packet(CMD_STATUS, bytes((0b10000001, 0, 1)))
+    assert encoded == bytes((0x0F, 8, ord("S"), 0x81, 0x00, 0x01, 0x14, 0xF0))
+    assert sum(encoded[:-1]) & 0xFF == 0
+    assert checksum(encoded[:-2]) == encoded[-2]
+    # The client and the emulator frame packets the same way
+    assert encoded == packet(CMD_STATUS, bytes((0b10000001, 0, 1)))
+
+
+def test_read_packet() -> None:
+    """Packets are read back after any noise before their start."""
+    data = b"\x00\x42" + encode_packet(CMD_LOGGED_IN) + encode_packet(CMD_STATUS, b"\x03\x00\x00")
+    assert asyncio.run(_read(data)) == (CMD_LOGGED_IN, b"")
+
+
+@pytest.mark.parametrize(
+    ("data", "error"),
+    [
+        (encode_packet(CMD_STATUS, b"\x01\x00\x00")[:-2] + b"\x00\xf0", "Checksum"),
+        (encode_packet(CMD_STATUS, b"\x01\x00\x00")[:-1] + b"\x00", "end of packet"),
+        (bytes((0x0F, 3, CMD_STATUS)), "length"),
+    ],
+    ids=["checksum", "end", "length"],
+)
+def test_read_bad_packet(data: bytes, error: str) -> None:
+    """Corrupt packets are refused."""
+    with pytest.raises(PacketError, match=error):
+        asyncio.run(_read(data))
+
+
+def test_decode_status() -> None:
+    """The output, timer and input bits are unpacked."""
+    status = decode_status(bytes((0b00000101, 0b10000000, 1)))
+    assert status == StatusPacket(
+        [True, False, True, False, False, False, False, False],
+        [False] * 7 + [True],
+        True,
+    )
+    with pytest.raises(PacketError):
+        decode_status(b"\x01")
+
+
+def run_with_board(test: Callable[[FakeVM201], Awaitable[None]]) -> None:
+    """Run a test coroutine against a fake board with the control protocol."""
+
+    async def run() -> None:
+        board = FakeVM201(user=USER, pwd=PWD, protocol_port=0)
+        await board.start()
+        try:
+            await test(board)
+        finally:
+            await board.stop()
+
+    asyncio.run(run())
+
+
+def test_login_and_push() -> None:
+    """After the login the client gets the current status and every change pushed."""
+    statuses: list[StatusPacket] = []
+    connection: list[bool] = []
+
+    async def test(board: FakeVM201) -> None:
+        board.outputs[2] = True
+        client = ProtocolClient(
+            board.host,
+            board.protocol_port,
+            USER,
+            PWD,
+            on_status=statuses.append,
+            on_connection=connection.append,
+        )
+        listener = asyncio.create_task(client.run())
+        try:
+            async with asyncio.timeout(2):
+                while not statuses:
+                    await asyncio.sleep(0.01)
+                assert client.connected
+                board.switch(0b1, 0)
+                while len(statuses) < 2:
+                    await asyncio.sleep(0.01)
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+
+    run_with_board(test)
+    assert connection == [True, False]
+    assert [status.outputs[:3] for status in statuses] == [
+        [False, False, True],
+        [True, False, True],
+    ]
+
+
+def test_set_outputs() -> None:
+    """Relay commands switch the outputs of the board."""
+
+    async def test(board: FakeVM201) -> None:
+        client = ProtocolClient(board.host, board.protocol_port, USER, PWD)
+        await client.connect()
+        try:
+            await client.set_outputs(0b101, 0b10)
+            async with asyncio.timeout(2):
+                while board.requests.get("F") is None:
+                    await asyncio.sleep(0.01)
+        finally:
+            await client.close()
+        assert board.outputs[:3] == [True, False, True]
+
+    run_with_board(test)
+
+
+def test_access_denied() -> None:
+    """Wrong credentials raise APIAuthError and leave the client disconnected."""
+
+    async def test(board: FakeVM201) -> None:
+        client = ProtocolClient(board.host, board.protocol_port, USER, "wrong")
+        with pytest.raises(APIAuthError):
+            await client.connect()
+        assert not client.connected
+
+    run_with_board(test)
+
+
+def test_keepalive_drops_silent_connection(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A board that stops answering is taken as disconnected after the keepalive."""
+    monkeypatch.setattr(protocol, "KEEPALIVE_INTERVAL", 0.05)
+    monkeypatch.setattr(protocol, "KEEPALIVE_TIMEOUT", 0.05)
+    connection: list[bool] = []
+
+    async def silent(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Log in, then ignore every request like a half-open connection
+        writer.write(packet(CMD_LOGGED_IN))
+        await reader.read()
+        writer.close()
+
+    async def run() -> None:
+        server = await asyncio.start_server(silent, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = ProtocolClient("127.0.0.1", port, on_connection=connection.append)
+        try:
+            await client.connect()
+            async with asyncio.timeout(2):
+                await client.listen()
+        finally:
+            server.close()
+        assert not client.connected
+
+    asyncio.run(run())
+    assert connection == [True, False]
@@ -0,0 +1,55 @@
+"""The relay on time, switch count and duty cycle counters."""
+
+from __future__ import annotations
+
+from custom_components.velleman_vm201.const import RUNTIME_DUTY_WINDOW
+from custom_components.velleman_vm201.runtime import BUCKET, RelayRuntime
+
+# Start of an hour, so the buckets line up with the samples
+START = 1_700_000_000 - 1_700_000_000 % BUCKET
+
+
+def test_on_time_and_switches() -> None:
+    """On time runs from a sample showing the relay on to the next sample."""
+    runtime = RelayRuntime(START)
+    assert runtime.record(False, START)
+    assert runtime.record(True, START + 10)
+    assert not runtime.record(True, START + 40)
+    assert runtime.record(False, START + 70)
+    assert runtime.on_time == 60
+    assert runtime.switches == 1
+    assert runtime.on_time_at(START + 100) == 60
+
+
+def test_bucket_rollover() -> None:
+    """An on period across the hour is split over both buckets and asks for a save."""
+    runtime = RelayRuntime(START)
+    runtime.record(True, START)
+    assert not runtime.record(True, START + BUCKET - 600)
+    # The sample in the next hour starts a new bucket
+    assert runtime.record(True, START + BUCKET + 600)
+    assert runtime.as_dict()["buckets"] == [[START, BUCKET], [START + BUCKET, 600]]
+    # On for the whole time since the start
+    assert runtime.duty_cycle(START + BUCKET + 600) == 100
+
+
+def test_duty_cycle_window() -> None:
+    """Hours that left the window no longer count, the oldest one only in part."""
+    runtime = RelayRuntime(START)
+    runtime.record(True, START)
+    runtime.record(False, START + BUCKET)
+    assert runtime.duty_cycle(START + 2 * BUCKET) == 50
+
+    later = START + RUNTIME_DUTY_WINDOW + BUCKET // 2
+    assert round(runtime.duty_cycle(later), 6) == round(BUCKET / 2 / RUNTIME_DUTY_WINDOW * 100, 6)
+    assert runtime.duty_cycle(START + RUNTIME_DUTY_WINDOW + BUCKET) == 0
+
+
+def test_stored_counters() -> None:
+    """The counters survive a round trip through the store format."""
+    runtime = RelayRuntime(START)
+    runtime.record(True, START)
+    runtime.record(False, START + 2 * BUCKET + 30)
+    restored = RelayRuntime.from_dict(runtime.as_dict())
+    assert restored.as_dict() == runtime.as_dict()
+    assert restored.duty_cycle(START + 3 * BUCKET) == runtime.duty_cycle(START + 3 * BUCKET)
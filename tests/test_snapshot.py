@@ -0,0 +1,36 @@
+"""The channel tables and state snapshots."""
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.velleman_vm201.api import AsyncAPI
+from custom_components.velleman_vm201.snapshot import BoardSnapshot, ChannelTable
+
+OUTPUTS = [True, False, False, True, False, False, False, True]
+
+
+@pytest.fixture
+def table(page) -> ChannelTable:
+    """Return the table of the channels on the names page."""
+    return ChannelTable(AsyncAPI("192.168.1.20").parse_devices(page("names.html")))
+
+
+def test_states(table: ChannelTable) -> None:
+    """The output and input states are packed into one mask."""
+    snapshot = BoardSnapshot(table, table.states(OUTPUTS, [True]))
+    assert [snapshot.state(channel) for channel in table.outputs] == OUTPUTS
+    assert snapshot.state(table.inputs[0])
+
+    previous = BoardSnapshot(table, table.states(OUTPUTS, [False]))
+    assert snapshot.changed(previous) == table.inputs[0].mask
+    assert snapshot.changed(None) == table.all_mask
+
+
+@pytest.mark.parametrize(
+    ("outputs", "inputs"), [(OUTPUTS[:7], [True]), (OUTPUTS, [])], ids=["outputs", "inputs"]
+)
+def test_states_missing_channel(table: ChannelTable, outputs: list[bool], inputs: list[bool]) -> None:
+    """A status without a state for every channel is refused."""
+    with pytest.raises(ValueError, match="names page 8 and 1"):
+        table.states(outputs, inputs)